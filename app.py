@@ -1,282 +1,357 @@
-# client.py
-
-# 1️⃣ Monkey patch must be first
-import eventlet
-eventlet.monkey_patch()
-
-# 2️⃣ Standard imports
-import os
-import json
-import threading
-import queue
-import logging
-import requests
-import asyncio
-import janus
-import websockets
-
-from flask import Flask, render_template, jsonify
-from flask_socketio import SocketIO
-from common.agent_functions import FUNCTION_MAP
-from common.agent_templates import AgentTemplates, AGENT_AUDIO_SAMPLE_RATE
-
-# 3️⃣ Flask app and SocketIO (eventlet async mode)
-app = Flask(__name__, static_folder="./static", static_url_path="/", template_folder="templates")
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode="eventlet")
-
-# 4️⃣ Logger setup
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-logger.addHandler(logging.StreamHandler())
-
-# 5️⃣ Global voice agent
-VOICE_AGENT = None
-AGENT_LOOP = None
-AGENT_THREAD = None
-
-# 6️⃣ VoiceAgent class
-class VoiceAgent:
-    def __init__(self, voiceModel="aura-2-apollo-en", voiceName="", browser_audio=True):
-        self.mic_audio_queue = asyncio.Queue()
-        self.speaker = None
-        self.ws = None
-        self.is_running = False
-        self.browser_audio = browser_audio
-        self.agent_templates = AgentTemplates(voiceModel, voiceName)
-
-    async def setup(self):
-        dg_api_key = os.environ.get("DEEPGRAM_API_KEY")
-        if not dg_api_key:
-            logger.error("DEEPGRAM_API_KEY env var not present")
-            return False
-        settings = self.agent_templates.settings
-        try:
-            self.ws = await websockets.connect(
-                self.agent_templates.voice_agent_url,
-                extra_headers={"Authorization": f"Token {dg_api_key}"}
-            )
-            await self.ws.send(json.dumps(settings))
-            return True
-        except Exception as e:
-            logger.error(f"Failed to connect to Deepgram: {e}")
-            return False
-
-    async def sender(self):
-        try:
-            while self.is_running:
-                data = await self.mic_audio_queue.get()
-                if self.ws and data:
-                    await self.ws.send(data)
-        except Exception as e:
-            logger.error(f"sender error: {e}")
-
-    async def receiver(self):
-        try:
-            self.speaker = Speaker(browser_output=True)
-            with self.speaker:
-                async for message in self.ws:
-                    if isinstance(message, str):
-                        try:
-                            msg = json.loads(message)
-                        except Exception:
-                            continue
-
-                        t = msg.get("type")
-                        if t == "ConversationText":
-                            socketio.emit("conversation_update", msg)
-                        if t in ("UserStartedSpeaking", "AgentAudioDone"):
-                            socketio.emit("agent_event", msg)
-                        elif t == "FunctionCallRequest":
-                            fn = msg.get("functions", [])[0]
-                            name = fn.get("name")
-                            call_id = fn.get("id")
-                            params = json.loads(fn.get("arguments", "{}"))
-                            try:
-                                impl = FUNCTION_MAP.get(name)
-                                if not impl:
-                                    raise ValueError(f"Unknown function: {name}")
-                                if name in ["agent_filler", "end_call"]:
-                                    result = await impl(self.ws, params)
-                                    resp = {
-                                        "type": "FunctionCallResponse",
-                                        "id": call_id,
-                                        "name": name,
-                                        "content": json.dumps(result["function_response"]),
-                                    }
-                                    await self.ws.send(json.dumps(resp))
-                                    await self.ws.send(json.dumps(result["inject_message"]))
-                                    if name == "end_call":
-                                        await asyncio.sleep(0.5)
-                                        await self.ws.close()
-                                        self.is_running = False
-                                        break
-                                else:
-                                    result = await impl(params)
-                                    resp = {
-                                        "type": "FunctionCallResponse",
-                                        "id": call_id,
-                                        "name": name,
-                                        "content": json.dumps(result),
-                                    }
-                                    await self.ws.send(json.dumps(resp))
-                            except Exception as e:
-                                resp = {
-                                    "type": "FunctionCallResponse",
-                                    "id": call_id,
-                                    "name": name,
-                                    "content": json.dumps({"error": str(e)}),
-                                }
-                                await self.ws.send(json.dumps(resp))
-                        elif t == "CloseConnection":
-                            await self.ws.close()
-                            break
-                    elif isinstance(message, bytes):
-                        await self.speaker.play(message)
-        except Exception as e:
-            logger.error(f"receiver error: {e}")
-
-    async def run(self):
-        if not await self.setup():
-            return
-        self.is_running = True
-        try:
-            await asyncio.gather(self.sender(), self.receiver())
-        finally:
-            self.is_running = False
-            if self.ws:
-                try: await self.ws.close()
-                except: pass
-
-# 7️⃣ Speaker class
-class Speaker:
-    def __init__(self, browser_output=True):
-        self._queue = None
-        self._thread = None
-        self._stop = None
-        self.browser_output = browser_output
-
-    def __enter__(self):
-        self._queue = janus.Queue()
-        self._stop = threading.Event()
-        self._thread = threading.Thread(target=_play, args=(self._queue, self._stop), daemon=True)
-        self._thread.start()
-        return self
-
-    def __exit__(self, exc_type, exc_value, traceback):
-        self._stop.set()
-        self._thread.join()
-        self._queue = None
-        self._thread = None
-        self._stop = None
-
-    async def play(self, data):
-        return await self._queue.async_q.put(data)
-
-def _play(audio_out, stop):
-    seq = 0
-    while not stop.is_set():
-        try:
-            data = audio_out.sync_q.get(True, 0.05)
-            socketio.emit("audio_output", {"audio": data, "sampleRate": AGENT_AUDIO_SAMPLE_RATE, "seq": seq})
-            seq += 1
-        except queue.Empty:
-            pass
-
-# 8️⃣ Run asyncio loop in a separate thread
-def run_async_loop_in_thread(loop):
-    """Run asyncio event loop in a dedicated thread"""
-    asyncio.set_event_loop(loop)
-    loop.run_forever()
-
-def start_agent_loop():
-    """Initialize and start the asyncio event loop in a background thread"""
-    global AGENT_LOOP, AGENT_THREAD
-    if AGENT_LOOP is None or AGENT_LOOP.is_closed():
-        AGENT_LOOP = asyncio.new_event_loop()
-        AGENT_THREAD = threading.Thread(target=run_async_loop_in_thread, args=(AGENT_LOOP,), daemon=True)
-        AGENT_THREAD.start()
-    return AGENT_LOOP
-
-# 9️⃣ Routes
-@app.route("/")
-def index():
-    return render_template("index.html")
-
-@app.route("/tts-models")
-def get_tts_models():
-    try:
-        dg_api_key = os.environ.get("DEEPGRAM_API_KEY")
-        if not dg_api_key:
-            return jsonify({"error": "DEEPGRAM_API_KEY not set"}), 500
-        response = requests.get("https://api.deepgram.com/v1/models",
-                                headers={"Authorization": f"Token {dg_api_key}"})
-        if response.status_code != 200:
-            return jsonify({"error": f"API status {response.status_code}"}), 500
-        data = response.json()
-        formatted = []
-        if "tts" in data:
-            for model in data["tts"]:
-                if model.get("architecture") == "aura-2":
-                    lang = (model.get("languages") or ["en"])[0]
-                    md = model.get("metadata", {})
-                    formatted.append({
-                        "name": model.get("canonical_name", model.get("name")),
-                        "display_name": model.get("name"),
-                        "language": lang,
-                        "accent": md.get("accent", ""),
-                        "tags": ", ".join(md.get("tags", [])),
-                    })
-        return jsonify({"models": formatted})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-# 1️⃣0️⃣ SocketIO handlers
-@socketio.on("start_voice_agent")
-def handle_start_voice_agent(data=None):
-    global VOICE_AGENT
-    
-    # Stop existing agent if running
-    if VOICE_AGENT:
-        VOICE_AGENT.is_running = False
-        VOICE_AGENT = None
-
-    voiceModel = data.get("voiceModel", "aura-2-apollo-en") if data else "aura-2-apollo-en"
-    voiceName = data.get("voiceName", "") if data else ""
-    VOICE_AGENT = VoiceAgent(voiceModel=voiceModel, voiceName=voiceName, browser_audio=True)
-
-    # Get or create the asyncio loop running in background thread
-    loop = start_agent_loop()
-    
-    # Schedule the coroutine in the dedicated asyncio loop
-    asyncio.run_coroutine_threadsafe(VOICE_AGENT.run(), loop)
-
-@socketio.on("stop_voice_agent")
-def handle_stop_voice_agent():
-    global VOICE_AGENT
-    if VOICE_AGENT:
-        VOICE_AGENT.is_running = False
-        VOICE_AGENT = None
-
-@socketio.on("audio_data")
-def handle_audio_data(data):
-    global VOICE_AGENT, AGENT_LOOP
-    if VOICE_AGENT and VOICE_AGENT.is_running and VOICE_AGENT.browser_audio and AGENT_LOOP:
-        audio_buffer = data.get("audio")
-        if not audio_buffer:
-            return
-        try:
-            if isinstance(audio_buffer, memoryview):
-                audio_bytes = audio_buffer.tobytes()
-            elif isinstance(audio_buffer, bytes):
-                audio_bytes = audio_buffer
-            else:
-                audio_bytes = bytes(audio_buffer)
-            # Put audio data into queue via the dedicated asyncio loop
-            asyncio.run_coroutine_threadsafe(VOICE_AGENT.mic_audio_queue.put(audio_bytes), AGENT_LOOP)
-        except Exception as e:
-            logger.error(f"audio_data error: {e}")
-
-# 1️⃣1️⃣ Main entry
-if __name__ == "__main__":
-    print("\nOpen http://127.0.0.1:5000\n")
-    socketio.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 5000)), debug=True)
+# client.py
+
+# 1️⃣ Monkey patch must be first
+import eventlet
+eventlet.monkey_patch()
+
+# 2️⃣ Standard imports
+import os
+import hmac
+import json
+import threading
+import logging
+import asyncio
+
+from flask import Flask, render_template, jsonify, request
+from flask_socketio import SocketIO, join_room
+from common.function_dispatcher import FunctionDispatcher
+from common.prefetch import RetrievalPrefetcher
+from common.agent_templates import AgentTemplates, AGENT_AUDIO_SAMPLE_RATE
+from common.session_manager import SessionManager, SessionLimitError
+from common.agent_pool import AgentConnectionPool
+from common.audio_emitter import AudioEmitter
+from common.resampler import make_upstream_resampler, valid_mic_rate
+from common.rag_store import warm_store, StaleIndexError
+from common.metrics import TurnTracer, Gauge, render_metrics
+from common.tts_models import TTS_MODELS
+from common.audio_codec import get_codec, negotiate
+from common.audio_framing import negotiate_framing, pack_frames, MAX_FRAME_SAMPLES
+from common.config import ADPCM_BLOCK_SAMPLES, LOG_SHIP_ENABLED, LOG_SHIP_ROOM, USER_AUDIO_SAMPLE_RATE, PREFETCH_ENABLED
+from common.log_formatter import BrowserLogHandler
+
+# 3️⃣ Flask app and SocketIO (eventlet async mode)
+app = Flask(__name__, static_folder="./static", static_url_path="/", template_folder="templates")
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode="eventlet")
+
+# 4️⃣ Logger setup
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler())
+if LOG_SHIP_ENABLED:
+    # batched and rate-limited by a background task; logging calls only enqueue.
+    # Lines go to LOG_SHIP_ROOM only; common.* carries the per-turn latency and function-call lines.
+    BROWSER_LOGS = BrowserLogHandler(socketio)
+    logger.addHandler(BROWSER_LOGS)
+    logging.getLogger("common").setLevel(logging.INFO)
+    logging.getLogger("common").addHandler(BROWSER_LOGS)
+
+# 5️⃣ Voice agent sessions (one per Socket.IO connection) and the shared agent loop
+SESSIONS = SessionManager()
+Gauge("voice_active_sessions", "Conversations currently running.", lambda: len(SESSIONS))
+AGENT_LOOP = None
+AGENT_THREAD = None
+AGENT_POOL = AgentConnectionPool()
+
+# 🔎 RAG index: load the prebuilt artifact now so no visitor pays for parsing/embedding;
+# a stale artifact stops the server instead of answering from outdated documents
+try:
+    warm_store()
+except StaleIndexError as e:
+    logger.error(f"RAG index: {e}")
+    raise SystemExit(1)
+
+# 6️⃣ VoiceAgent class
+class VoiceAgent:
+    def __init__(self, sid, voiceModel="aura-2-apollo-en", voiceName="", browser_audio=True, codec="linear16", framing="json"):
+        self.sid = sid
+        self.codec = codec  # browser audio codec negotiated at start, both directions
+        self.framing = framing  # "binary": TTS goes out as packed audio_frames
+        self.mic_audio_queue = asyncio.Queue()
+        self.mic_rate = None  # reported by the page with its first mic frame
+        self.resampler = None  # mic_rate -> upstream rate, state kept per session
+        self._rate_warned = False
+        self.speaker = None
+        self.ws = None
+        self.dispatcher = None
+        self.prefetcher = None
+        self.tracer = TurnTracer(sid)  # per-turn latency histograms (see /metrics)
+        self.backlog = []  # messages a pooled connection received before this session took it
+        self.is_running = False
+        self.stopped = False
+        self.loop = None
+        self.browser_audio = browser_audio
+        self.agent_templates = AgentTemplates(voiceModel, voiceName)
+
+    def stop(self):
+        """Thread-safe: end this session's sender/receiver and close its websocket."""
+        self.stopped = True
+        self.is_running = False
+        if self.loop and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.mic_audio_queue.put_nowait, b"")
+            if self.ws:
+                asyncio.run_coroutine_threadsafe(self.ws.close(), self.loop)
+
+    async def setup(self):
+        pooled = await AGENT_POOL.acquire(self.agent_templates.voiceModel)
+        if pooled:
+            self.ws, self.backlog = pooled
+            return True
+        dg_api_key = os.environ.get("DEEPGRAM_API_KEY")
+        if not dg_api_key:
+            logger.error("DEEPGRAM_API_KEY env var not present")
+            return False
+        try:
+            import websockets  # deferred: imported by the first session, not at boot
+            self.ws = await websockets.connect(
+                self.agent_templates.voice_agent_url,
+                extra_headers={"Authorization": f"Token {dg_api_key}"}
+            )
+            await self.ws.send(self.agent_templates.settings_json)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to connect to Deepgram: {e}")
+            return False
+
+    async def messages(self):
+        for message in self.backlog:
+            yield message
+        self.backlog = []
+        async for message in self.ws:
+            yield message
+
+    def accept_mic_rate(self, rate) -> bool:
+        """Fix the session's mic rate from the first frame; frames at another rate are dropped."""
+        if self.mic_rate is None and valid_mic_rate(rate):
+            self.mic_rate = rate
+            self.resampler = make_upstream_resampler(rate)
+        if rate == self.mic_rate:
+            return True
+        if not self._rate_warned:
+            self._rate_warned = True
+            logger.warning(f"mic audio at {rate!r} Hz (session rate {self.mic_rate}); dropping those frames")
+        return False
+
+    async def sender(self):
+        try:
+            while self.is_running:
+                data = await self.mic_audio_queue.get()
+                if self.ws and data:
+                    if self.resampler:
+                        data = self.resampler.process_bytes(data)
+                    await self.ws.send(data)
+        except Exception as e:
+            logger.error(f"sender error: {e}")
+
+    async def receiver(self):
+        self.prefetcher = RetrievalPrefetcher() if PREFETCH_ENABLED else None
+        self.dispatcher = FunctionDispatcher(self.ws, on_end_call=self.end_call, prefetcher=self.prefetcher)
+        try:
+            self.speaker = Speaker(self.sid, browser_output=True, codec=self.codec, framing=self.framing)
+            with self.speaker:
+                async for message in self.messages():
+                    if isinstance(message, str):
+                        try:
+                            msg = json.loads(message)
+                        except Exception:
+                            continue
+
+                        t = msg.get("type")
+                        if t == "ConversationText":
+                            socketio.emit("conversation_update", msg, to=self.sid)
+                            if msg.get("role") == "user":
+                                self.tracer.user_text()
+                                if self.prefetcher is not None:
+                                    # start retrieval now instead of after the LLM's function call
+                                    self.prefetcher.prefetch(msg.get("content", ""))
+                        elif t == "UserStartedSpeaking":
+                            socketio.emit("agent_event", msg, to=self.sid)
+                            self.tracer.user_started_speaking()
+                        elif t == "AgentAudioDone":
+                            socketio.emit("agent_event", msg, to=self.sid)
+                        elif t == "FunctionCallRequest":
+                            self.tracer.function_call()
+                            # runs as tasks; the receiver keeps streaming audio meanwhile
+                            self.dispatcher.dispatch(msg)
+                        elif t == "CloseConnection":
+                            await self.ws.close()
+                            break
+                    elif isinstance(message, bytes):
+                        first = self.tracer.audio()
+                        await self.speaker.play(message, on_emitted=self.tracer.emitted if first else None)
+        except Exception as e:
+            logger.error(f"receiver error: {e}")
+        finally:
+            self.dispatcher.close()
+            if self.prefetcher is not None:
+                self.prefetcher.close()
+            self.is_running = False
+            self.mic_audio_queue.put_nowait(b"")  # wake the sender so run() can finish
+
+    async def end_call(self):
+        await asyncio.sleep(0.5)
+        await self.ws.close()
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        try:
+            if not await self.setup() or self.stopped:
+                return
+            self.is_running = True
+            await asyncio.gather(self.sender(), self.receiver())
+        finally:
+            self.is_running = False
+            if self.ws:
+                try: await self.ws.close()
+                except: pass
+            SESSIONS.remove(self.sid, self)
+
+# 7️⃣ Speaker class
+class Speaker:
+    """Streams agent TTS to this session's browser via an AudioEmitter on the agent loop."""
+    def __init__(self, sid, browser_output=True, codec="linear16", framing="json"):
+        self.sid = sid
+        self.browser_output = browser_output
+        self.codec = get_codec(codec)
+        self.framing = framing
+        self._frame_seq = 0
+        self._odd_byte = b""  # trailing half sample, completed by the next chunk
+        self._emitter = None
+
+    def __enter__(self):
+        self._emitter = AudioEmitter(self._emit, emit_batch=self._emit_frames if self.framing == "binary" else None)
+        self._emitter.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._emitter.stop()
+        self._emitter = None
+
+    async def play(self, data, on_emitted=None):
+        # whole samples only, for both framings: a trailing half sample waits for the next chunk
+        data = self._odd_byte + data
+        even = len(data) - len(data) % 2
+        self._odd_byte = data[even:]
+        if even:
+            self._emitter.push(data[:even], on_emitted)
+
+    def _emit(self, data, seq):
+        payload = {"audio": self.codec.encode(data), "codec": self.codec.name, "samples": len(data) // 2,
+                   "sampleRate": AGENT_AUDIO_SAMPLE_RATE, "seq": seq}
+        socketio.emit("audio_output", payload, to=self.sid)
+
+    def _emit_frames(self, frames):
+        # binary framing: one event carries every queued packet as [seq, flags, samples] + payload
+        packed = []
+        for data, _ in frames:
+            for i in range(0, len(data), 2 * MAX_FRAME_SAMPLES):
+                pcm = data[i:i + 2 * MAX_FRAME_SAMPLES]
+                packed.append((self._frame_seq, len(pcm) // 2, self.codec.encode(pcm)))
+                self._frame_seq += 1
+        if packed:
+            socketio.emit("audio_frames", pack_frames(packed, self.codec.name), to=self.sid)
+
+# 8️⃣ Run asyncio loop in a separate thread
+def run_async_loop_in_thread(loop):
+    """Run asyncio event loop in a dedicated thread"""
+    asyncio.set_event_loop(loop)
+    loop.run_forever()
+
+def start_agent_loop():
+    """Initialize and start the asyncio event loop in a background thread"""
+    global AGENT_LOOP, AGENT_THREAD
+    if AGENT_LOOP is None or AGENT_LOOP.is_closed():
+        AGENT_LOOP = asyncio.new_event_loop()
+        AGENT_THREAD = threading.Thread(target=run_async_loop_in_thread, args=(AGENT_LOOP,), daemon=True)
+        AGENT_THREAD.start()
+        AGENT_LOOP.call_soon_threadsafe(AGENT_POOL.start)
+    return AGENT_LOOP
+
+# 9️⃣ Routes
+@app.route("/")
+def index():
+    TTS_MODELS.refresh_async()  # warm the voice list before the page asks for it
+    return render_template("index.html")
+
+@app.route("/metrics")
+def metrics():
+    # Prometheus text exposition: per-turn latency histograms + active sessions
+    return app.response_class(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/tts-models")
+def get_tts_models():
+    # served from memory; the catalog refreshes from Deepgram in the background
+    if not os.environ.get("DEEPGRAM_API_KEY"):
+        return jsonify({"error": "DEEPGRAM_API_KEY not set"}), 500
+    try:
+        return app.response_class(TTS_MODELS.body(), mimetype="application/json")
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# 1️⃣0️⃣ SocketIO handlers
+@socketio.on("connect")
+def handle_connect():
+    # page opened: bring up the agent loop so the connection pool warms before "start"
+    start_agent_loop()
+
+@socketio.on("subscribe_logs")
+def handle_subscribe_logs(data=None):
+    # server logs mention every visitor's session, so only holders of LOG_SHIP_TOKEN may join
+    token = os.environ.get("LOG_SHIP_TOKEN", "")
+    given = str(data.get("token", "")) if isinstance(data, dict) else ""
+    if LOG_SHIP_ENABLED and token and hmac.compare_digest(given.encode(), token.encode()):
+        join_room(LOG_SHIP_ROOM)
+
+@socketio.on("start_voice_agent")
+def handle_start_voice_agent(data=None):
+    sid = request.sid
+    voiceModel = data.get("voiceModel", "aura-2-apollo-en") if data else "aura-2-apollo-en"
+    voiceName = data.get("voiceName", "") if data else ""
+    codec = negotiate(data.get("codecs") if data else None)
+    framing = negotiate_framing(data.get("framing") if data else None)
+
+    # Replaces this visitor's previous session only; other visitors are untouched
+    try:
+        agent = SESSIONS.create(sid, lambda: VoiceAgent(sid, voiceModel=voiceModel, voiceName=voiceName, browser_audio=True, codec=codec, framing=framing))
+    except SessionLimitError as e:
+        socketio.emit("session_error", {"error": str(e)}, to=sid)
+        return
+    socketio.emit("audio_codec", {"input": codec, "output": codec, "adpcmBlock": ADPCM_BLOCK_SAMPLES,
+                                  "framing": framing, "sampleRate": AGENT_AUDIO_SAMPLE_RATE}, to=sid)
+
+    # Schedule the coroutine in the dedicated asyncio loop
+    asyncio.run_coroutine_threadsafe(agent.run(), start_agent_loop())
+
+@socketio.on("stop_voice_agent")
+def handle_stop_voice_agent():
+    SESSIONS.remove(request.sid)
+
+@socketio.on("disconnect")
+def handle_disconnect():
+    SESSIONS.remove(request.sid)
+
+@socketio.on("audio_data")
+def handle_audio_data(data):
+    agent = SESSIONS.get(request.sid)
+    if agent and agent.is_running and agent.browser_audio and agent.loop:
+        audio_buffer = data.get("audio")
+        if not audio_buffer:
+            return
+        try:
+            if isinstance(audio_buffer, memoryview):
+                audio_bytes = audio_buffer.tobytes()
+            elif isinstance(audio_buffer, bytes):
+                audio_bytes = audio_buffer
+            else:
+                audio_bytes = bytes(audio_buffer)
+            if not agent.accept_mic_rate(data.get("sampleRate", USER_AUDIO_SAMPLE_RATE)):
+                return
+            audio_bytes = get_codec(data.get("codec")).decode(audio_bytes, data.get("samples"))
+            # Put audio data into this session's queue via the dedicated asyncio loop
+            asyncio.run_coroutine_threadsafe(agent.mic_audio_queue.put(audio_bytes), agent.loop)
+        except Exception as e:
+            logger.error(f"audio_data error: {e}")
+
+# 1️⃣1️⃣ Main entry
+if __name__ == "__main__":
+    print("\nOpen http://127.0.0.1:5000\n")
+    socketio.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 5000)), debug=True)
@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# Run from the repo root, e.g. `python -m benchmarks.bench_embedding_cache`.
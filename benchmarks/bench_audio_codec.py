@@ -0,0 +1,65 @@
+# benchmarks/bench_audio_codec.py
+"""CPU cost and bandwidth of the browser audio codecs.
+
+    python -m benchmarks.bench_audio_codec --seconds 2
+
+For each codec and direction (TTS out: 16 kHz in 100 ms packets; mic in: 48 kHz
+in 4096-sample frames) it encodes and decodes a synthetic voiced signal packet by
+packet and reports CPU milliseconds per second of audio (process time, so per
+core), wire bytes per second, bandwidth saved against linear16 and the SNR of
+the round trip.
+"""
+import argparse, json, time
+import numpy as np
+
+from common.audio_codec import CODECS
+from common.config import AGENT_AUDIO_SAMPLE_RATE, AUDIO_PACKET_MS, USER_AUDIO_SAMPLE_RATE
+
+DIRECTIONS = {
+    "tts_out": (AGENT_AUDIO_SAMPLE_RATE, int(AGENT_AUDIO_SAMPLE_RATE * AUDIO_PACKET_MS / 1000)),
+    "mic_in": (USER_AUDIO_SAMPLE_RATE, 4096),
+}
+
+
+def _voice(rate: int, seconds: float) -> np.ndarray:
+    """Harmonic 'vowel' with a syllable-rate envelope and a little noise."""
+    t = np.arange(int(rate * seconds)) / rate
+    f0 = 140 + 20 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / rate
+    x = sum(np.sin(k * phase) * 5000 / k for k in range(1, 12))
+    x *= 0.3 + 0.7 * np.abs(np.sin(2 * np.pi * 2.5 * t))
+    x += np.random.default_rng(0).standard_normal(len(t)) * 150
+    return np.clip(x, -32768, 32767).astype("<i2")
+
+
+def _bench(codec, rate: int, packet: int, seconds: float) -> dict:
+    pcm = _voice(rate, seconds)
+    packets = [pcm[i:i + packet].tobytes() for i in range(0, len(pcm), packet)]
+    t0 = time.process_time()
+    encoded = [codec.encode(p) for p in packets]
+    t1 = time.process_time()
+    decoded = [codec.decode(e, len(p) // 2) for e, p in zip(encoded, packets)]
+    t2 = time.process_time()
+    out = np.frombuffer(b"".join(decoded), dtype="<i2").astype(np.float64)
+    err = out - pcm
+    snr = 10 * np.log10((pcm.astype(np.float64) ** 2).mean() / max((err ** 2).mean(), 1e-12))
+    wire = sum(len(e) for e in encoded) / seconds
+    return {"encode_ms_per_audio_s": round((t1 - t0) * 1000 / seconds, 3),
+            "decode_ms_per_audio_s": round((t2 - t1) * 1000 / seconds, 3),
+            "bytes_per_s": round(wire), "saved_pct": round(100 * (1 - wire / (2 * rate)), 1),
+            "snr_db": round(min(snr, 99.0), 1)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--codecs", nargs="+", default=list(CODECS))
+    args = ap.parse_args()
+    for direction, (rate, packet) in DIRECTIONS.items():
+        for name in args.codecs:
+            print(json.dumps({"direction": direction, "codec": name, "sample_rate": rate, "packet_samples": packet,
+                              **_bench(CODECS[name], rate, packet, args.seconds)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/bench_audio_emitter.py
+"""Chunk-to-emit latency of the legacy Speaker thread vs the loop-driven AudioEmitter.
+
+    python -m benchmarks.bench_audio_emitter --bursts 50
+
+TTS arrives in bursts (agent audio is generated faster than real time); every chunk's
+time from arrival on the agent loop to the emit call is recorded. The legacy path is
+the old Speaker: janus queue (or queue.Queue if janus is not installed) polled by a
+per-session thread with a 50 ms timeout, one emit per chunk.
+"""
+import argparse, asyncio, json, queue, threading, time
+
+from common.audio_emitter import AudioEmitter
+from benchmarks._util import percentile
+
+CHUNK = b"\x00\x00" * 320  # 20 ms of 16 kHz linear16
+
+
+def _summary(name, latencies, emits, chunks):
+    ms = [x * 1000 for x in latencies]
+    return {"emitter": name, "chunks": chunks, "emits": emits,
+            "p50_ms": round(percentile(ms, 50), 3), "p90_ms": round(percentile(ms, 90), 3),
+            "p99_ms": round(percentile(ms, 99), 3), "max_ms": round(max(ms), 3)}
+
+
+async def _produce(push, bursts, burst_len, gap_s):
+    for _ in range(bursts):
+        for _ in range(burst_len):
+            push(CHUNK)
+            await asyncio.sleep(0.002)
+        await asyncio.sleep(gap_s)
+
+
+async def _legacy(bursts, burst_len, gap_s):
+    try:
+        import janus
+        q = janus.Queue()
+        put_async, get_sync, name = q.async_q.put, (lambda: q.sync_q.get(True, 0.05)), "legacy_thread_janus"
+    except ImportError:
+        q = queue.Queue()
+        loop = asyncio.get_running_loop()
+        async def put_async(item):
+            await loop.run_in_executor(None, q.put, item)
+        get_sync, name = (lambda: q.get(True, 0.05)), "legacy_thread_queue"
+    latencies, emits, stop = [], [0], threading.Event()
+
+    def play():
+        while not stop.is_set():
+            try:
+                stamp, _ = get_sync()
+                latencies.append(time.perf_counter() - stamp)
+                emits[0] += 1
+            except queue.Empty:
+                pass
+
+    t = threading.Thread(target=play, daemon=True)
+    t.start()
+    pending = []
+    await _produce(lambda d: pending.append(asyncio.ensure_future(put_async((time.perf_counter(), d)))),
+                   bursts, burst_len, gap_s)
+    await asyncio.gather(*pending)
+    await asyncio.sleep(0.2)
+    stop.set()
+    t.join()
+    return _summary(name, latencies, emits[0], bursts * burst_len)
+
+
+async def _emitter(bursts, burst_len, gap_s, packet_ms):
+    emits = [0]
+    em = AudioEmitter(lambda data, seq: emits.__setitem__(0, emits[0] + 1), packet_ms=packet_ms)
+    em.start()
+    await _produce(em.push, bursts, burst_len, gap_s)
+    await asyncio.sleep(0.2)
+    em.stop()
+    return _summary(f"audio_emitter_{packet_ms}ms", list(em.latencies), emits[0], bursts * burst_len)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--bursts", type=int, default=50)
+    ap.add_argument("--burst-len", type=int, default=10)
+    ap.add_argument("--gap", type=float, default=0.1)
+    ap.add_argument("--packet-ms", type=float, nargs="+", default=[20, 100])
+    args = ap.parse_args()
+    print(json.dumps(asyncio.run(_legacy(args.bursts, args.burst_len, args.gap))))
+    for packet_ms in args.packet_ms:
+        print(json.dumps(asyncio.run(_emitter(args.bursts, args.burst_len, args.gap, packet_ms))))
+
+
+if __name__ == "__main__":
+    main()
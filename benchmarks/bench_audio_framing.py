@@ -0,0 +1,107 @@
+# benchmarks/bench_audio_framing.py
+"""Bytes on the wire and emits per second: JSON "audio_output" vs binary "audio_frames".
+
+    python -m benchmarks.bench_audio_framing --seconds 2 --chunk-ms 20
+
+Synthetic TTS chunks are pushed into an AudioEmitter either paced in real time or
+in bursts (--burst-len chunks at once, --speedup times faster than real time, as
+the agent sends them). Each emit is built the way Speaker builds it and encoded
+with python-socketio's packet encoder; wire bytes are the websocket messages that
+result (the text packet plus one binary message per attachment, each with its
+2-10 byte frame header). Reported per pattern, codec and framing: events and
+websocket messages per second of audio, wire bytes per second, header overhead
+over the audio payload and bytes saved against JSON.
+"""
+import argparse, asyncio, json
+
+from socketio import packet
+
+from common.audio_codec import CODECS
+from common.audio_emitter import AudioEmitter
+from common.audio_framing import pack_frames
+from common.config import AGENT_AUDIO_SAMPLE_RATE, AUDIO_BATCH_FRAMES, AUDIO_PACKET_MS
+
+FRAMINGS = {"json": 1, "binary_1": 1, f"binary_{AUDIO_BATCH_FRAMES}": AUDIO_BATCH_FRAMES}
+
+
+def _ws_header(size: int) -> int:
+    return 2 if size < 126 else 4 if size < 65536 else 10  # server to client, unmasked
+
+
+class _Wire:
+    """Counts the websocket traffic of Socket.IO events."""
+
+    def __init__(self):
+        self.events = self.messages = self.bytes = self.payload = 0
+
+    def send(self, event: str, data, payload_bytes: int):
+        encoded = packet.Packet(packet.EVENT, data=[event, data], namespace="/").encode()
+        text, attachments = (encoded[0], encoded[1:]) if isinstance(encoded, list) else (encoded, [])
+        size = len(text.encode()) + 1  # engine.io "4" message prefix
+        self.bytes += _ws_header(size) + size + sum(_ws_header(len(a)) + len(a) for a in attachments)
+        self.messages += 1 + len(attachments)
+        self.events += 1
+        self.payload += payload_bytes
+
+
+def _emitter(codec, framing: str, wire: _Wire, packet_ms: float) -> AudioEmitter:
+    def emit(data, seq):
+        audio = codec.encode(data)
+        wire.send("audio_output", {"audio": audio, "codec": codec.name, "samples": len(data) // 2,
+                                   "sampleRate": AGENT_AUDIO_SAMPLE_RATE, "seq": seq}, len(audio))
+
+    def emit_frames(frames):
+        encoded = [(seq, len(data) // 2, codec.encode(data)) for data, seq in frames]
+        wire.send("audio_frames", pack_frames(encoded, codec.name), sum(len(e[2]) for e in encoded))
+
+    if framing == "json":
+        return AudioEmitter(emit, packet_ms=packet_ms)
+    return AudioEmitter(emit, packet_ms=packet_ms, emit_batch=emit_frames, batch_frames=FRAMINGS[framing])
+
+
+async def _run(codec, framing: str, pattern: str, args) -> dict:
+    chunk_s = args.chunk_ms / 1000.0
+    chunk = b"\x01\x00" * int(AGENT_AUDIO_SAMPLE_RATE * chunk_s)
+    chunks = max(1, round(args.seconds / chunk_s))
+    wire = _Wire()
+    em = _emitter(codec, framing, wire, args.packet_ms)
+    em.start()
+    if pattern == "paced":
+        for _ in range(chunks):
+            em.push(chunk)
+            await asyncio.sleep(chunk_s)
+    else:
+        for i in range(0, chunks, args.burst_len):
+            for _ in range(min(args.burst_len, chunks - i)):
+                em.push(chunk)
+            await asyncio.sleep(args.burst_len * chunk_s / args.speedup)
+    await asyncio.sleep(0.2)
+    em.stop()
+    audio_s = chunks * chunk_s
+    return {"pattern": pattern, "codec": codec.name, "framing": framing,
+            "events_per_s": round(wire.events / audio_s, 1), "ws_messages_per_s": round(wire.messages / audio_s, 1),
+            "wire_bytes_per_s": round(wire.bytes / audio_s), "payload_bytes_per_s": round(wire.payload / audio_s),
+            "overhead_pct": round(100.0 * (wire.bytes - wire.payload) / wire.payload, 2)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=2.0, help="seconds of TTS audio per run")
+    ap.add_argument("--chunk-ms", type=float, default=20.0, help="duration of each agent chunk")
+    ap.add_argument("--packet-ms", type=float, default=AUDIO_PACKET_MS)
+    ap.add_argument("--burst-len", type=int, default=10)
+    ap.add_argument("--speedup", type=float, default=4.0, help="burst delivery rate vs real time")
+    ap.add_argument("--codec", nargs="+", choices=sorted(CODECS), default=sorted(CODECS))
+    ap.add_argument("--pattern", nargs="+", choices=["paced", "burst"], default=["paced", "burst"])
+    args = ap.parse_args()
+    for pattern in args.pattern:
+        for name in args.codec:
+            results = [asyncio.run(_run(CODECS[name], framing, pattern, args)) for framing in FRAMINGS]
+            json_bytes = results[0]["wire_bytes_per_s"]
+            for r in results:
+                r["saved_vs_json_pct"] = round(100.0 * (json_bytes - r["wire_bytes_per_s"]) / json_bytes, 2)
+                print(json.dumps(r))
+
+
+if __name__ == "__main__":
+    main()
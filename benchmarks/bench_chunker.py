@@ -0,0 +1,59 @@
+# benchmarks/bench_chunker.py
+"""Peak memory and time-to-first-chunk of whole-string chunking vs the streaming chunker.
+
+    python -m benchmarks.bench_chunker --mb 50
+
+A plain-text document of --mb MiB is chunked both ways with tracemalloc on;
+"whole" is the previous path (read the whole file, then slice a full list),
+"streaming" reads 64 KiB pieces and consumes chunks as they are yielded.
+"""
+import argparse, json, os, tempfile, time, tracemalloc
+
+from common import rag_store
+from common.chunking import stream_chunks
+from common.config import CHUNK_SIZE, CHUNK_OVERLAP
+
+
+def _measure(name, make_chunks):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    first = None
+    count = 0
+    for _ in make_chunks():
+        if first is None:
+            first = time.perf_counter() - t0
+        count += 1
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"chunker": name, "chunks": count, "peak_mb": round(peak / 2**20, 2),
+            "first_chunk_ms": round((first or 0) * 1000, 2), "total_ms": round(elapsed * 1000, 1)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mb", type=float, default=50)
+    ap.add_argument("--boundary", choices=["char", "sentence", "token"], default="char")
+    args = ap.parse_args()
+    line = "Designed a low-latency voice agent. Shipped retrieval over profile documents!\n"
+    fd, path = tempfile.mkstemp(suffix=".txt")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(line * int(args.mb * 2**20 / len(line)))
+
+        def whole():
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                text = f.read()
+            return [t for _, t in stream_chunks([text], CHUNK_SIZE, CHUNK_OVERLAP, args.boundary)]
+
+        def streaming():
+            return (t for _, t in stream_chunks(rag_store._iter_text(path), CHUNK_SIZE, CHUNK_OVERLAP, args.boundary))
+
+        print(json.dumps({"doc_mb": args.mb, "boundary": args.boundary, **_measure("whole", whole)}))
+        print(json.dumps({"doc_mb": args.mb, "boundary": args.boundary, **_measure("streaming", streaming)}))
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
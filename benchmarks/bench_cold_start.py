@@ -0,0 +1,60 @@
+# benchmarks/bench_cold_start.py
+"""Import-time (cold start) of the agent modules, with a regression guard.
+
+    python -m benchmarks.bench_cold_start --runs 5 --max-ms 400
+
+Each module is imported in a fresh interpreter under ``python -X importtime``; the
+median cumulative import time is reported along with its heaviest dependencies.
+The run fails (exit 1) if a module pulls in a deferred dependency (openai, docx,
+websockets, requests) at import, or exceeds --max-ms.
+"""
+import argparse, json, os, statistics, subprocess, sys
+
+MODULES = ["common.agent_functions", "common.function_dispatcher", "common.agent_pool", "common.rag_store"]
+DEFERRED = ["openai", "docx", "websockets", "requests"]
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _import_once(module: str):
+    code = (f"import sys, json; import {module}; "
+            f"print(json.dumps([m for m in {DEFERRED!r} if m in sys.modules]))")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=_ROOT,
+                          capture_output=True, text=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        try:
+            times[name.strip()] = int(cumulative) / 1000.0  # ms
+        except ValueError:
+            continue  # header line
+    return times, json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--modules", nargs="+", default=MODULES)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--max-ms", type=float, default=None, help="fail if a module's median import exceeds this")
+    ap.add_argument("--top", type=int, default=5)
+    args = ap.parse_args()
+    failed = False
+    for module in args.modules:
+        runs = [_import_once(module) for _ in range(args.runs)]
+        total = statistics.median(t[module] for t, _ in runs)
+        last = runs[-1][0]
+        heaviest = sorted(((n, ms) for n, ms in last.items() if n != module and "." not in n),
+                          key=lambda x: -x[1])[:args.top]
+        loaded = sorted({m for _, mods in runs for m in mods})
+        over = args.max_ms is not None and total > args.max_ms
+        failed |= bool(loaded) or over
+        print(json.dumps({"module": module, "import_ms_median": round(total, 1),
+                          "import_ms_min": round(min(t[module] for t, _ in runs), 1),
+                          "heaviest_top_level": [{"module": n, "ms": round(ms, 1)} for n, ms in heaviest],
+                          "deferred_loaded": loaded, "over_budget": over}))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
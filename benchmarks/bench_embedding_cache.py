@@ -0,0 +1,71 @@
+# benchmarks/bench_embedding_cache.py
+"""Startup time and resident memory of the legacy JSON cache vs the binary mmap cache.
+
+    python -m benchmarks.bench_embedding_cache --chunks 5000 --dim 1536
+
+Each load runs in a fresh subprocess so RSS numbers are not polluted by the other format.
+"""
+import argparse, json, os, subprocess, sys, tempfile, time
+import numpy as np
+
+from common import rag_store
+from benchmarks._util import rss_mb
+
+SIG = "bench"
+
+
+def _write_caches(cache_dir: str, chunks: int, dim: int):
+    rng = np.random.default_rng(0)
+    mat = rng.standard_normal((chunks, dim)).astype(np.float32)
+    texts = [f"chunk {i} " * 40 for i in range(chunks)]
+    rag_store.RAG_CACHE_DIR = cache_dir
+    rag_store._save_binary_cache(SIG, "bench", texts, mat / np.linalg.norm(mat, axis=1, keepdims=True))
+    payload = {"model": "bench", "created": int(time.time()),
+               "chunks": [{"text": t, "vec": v} for t, v in zip(texts, mat.tolist())]}
+    with open(os.path.join(cache_dir, f"{SIG}.embeddings.json"), "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+
+
+def _load_once(cache_dir: str, fmt: str):
+    rag_store.RAG_CACHE_DIR = cache_dir
+    vec_file, _, json_file = rag_store._cache_paths(SIG)
+    before = rss_mb()
+    t0 = time.perf_counter()
+    if fmt == "json":
+        meta, mat = rag_store._load_json_cache(json_file)
+    else:
+        meta, mat = rag_store._load_binary_cache(SIG)
+    index = rag_store.DenseIndex(mat, normalized=True)
+    load_s = time.perf_counter() - t0
+    after_load = rss_mb()
+    index.search(np.ones(index.dim, dtype=np.float32), 5)  # touches every page once
+    after_search = rss_mb()
+    path = json_file if fmt == "json" else vec_file
+    print(json.dumps({
+        "format": fmt, "file_mb": round(os.path.getsize(path) / 2**20, 2),
+        "load_ms": round(load_s * 1000, 2),
+        "rss_after_load_mb": round(after_load - before, 2),
+        "rss_after_first_search_mb": round(after_search - before, 2),
+    }))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=2000)
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--load", choices=["json", "binary"])
+    ap.add_argument("--dir")
+    args = ap.parse_args()
+    if args.load:
+        _load_once(args.dir, args.load)
+        return
+    with tempfile.TemporaryDirectory() as d:
+        _write_caches(d, args.chunks, args.dim)
+        for fmt in ("json", "binary"):
+            out = subprocess.run([sys.executable, "-m", "benchmarks.bench_embedding_cache",
+                                  "--load", fmt, "--dir", d], capture_output=True, text=True, check=True)
+            print(out.stdout.strip())
+
+
+if __name__ == "__main__":
+    main()
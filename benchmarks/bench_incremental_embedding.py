@@ -0,0 +1,103 @@
+# benchmarks/bench_incremental_embedding.py
+"""Embedding calls and startup time after small edits to the profile DOCX.
+
+    python -m benchmarks.bench_incremental_embedding --paragraphs 400 --call-ms 300
+
+A synthetic DOCX is indexed once, then edited; every scenario rebuilds the dense
+index twice: with the content-addressed chunk store + text cache ("incremental")
+and from an empty cache directory, which is what any edit cost before ("full").
+The embedding API is replaced by a stand-in that sleeps --call-ms per request.
+"""
+import argparse, hashlib, json, os, shutil, tempfile, time
+from types import SimpleNamespace
+
+import numpy as np
+from docx import Document
+
+from common import rag_store
+
+
+class _FakeEmbeddings:
+    def __init__(self, call_s: float, dim: int):
+        self.call_s = call_s
+        self.dim = dim
+        self.calls = 0
+        self.inputs = 0
+
+    def create(self, model, input):
+        self.calls += 1
+        self.inputs += len(input)
+        time.sleep(self.call_s)
+        data = []
+        for text in input:
+            seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+            data.append(SimpleNamespace(embedding=np.random.default_rng(seed).standard_normal(self.dim).tolist()))
+        return SimpleNamespace(data=data)
+
+
+def _paragraph(i: int) -> str:
+    return f"Paragraph {i:05d}: worked on project {i % 37} using Python, Flask and retrieval pipelines. " * 3
+
+
+def _write_docx(path: str, paragraphs):
+    doc = Document()
+    for p in paragraphs:
+        doc.add_paragraph(p)
+    doc.save(path)
+
+
+def _build(doc_path: str, cache_dir: str, fake: _FakeEmbeddings) -> dict:
+    rag_store.RAG_CACHE_DIR = cache_dir
+    calls, inputs = fake.calls, fake.inputs
+    t0 = time.perf_counter()
+    store = rag_store.RagStore(doc_path, mode="dense")
+    return {"startup_ms": round((time.perf_counter() - t0) * 1000, 1), "chunks": len(store.chunks),
+            "embedding_calls": fake.calls - calls, "chunks_embedded": fake.inputs - inputs}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--paragraphs", type=int, default=400)
+    ap.add_argument("--call-ms", type=float, default=300.0)
+    ap.add_argument("--dim", type=int, default=1536)
+    args = ap.parse_args()
+
+    fake = _FakeEmbeddings(args.call_ms / 1000.0, args.dim)
+    rag_store._client = SimpleNamespace(embeddings=fake)
+    work = tempfile.mkdtemp(prefix="bench_incr_")
+    try:
+        doc_path = os.path.join(work, "profile.docx")
+        cache_dir = os.path.join(work, "cache")
+        base = [_paragraph(i) for i in range(args.paragraphs)]
+        _write_docx(doc_path, base)
+        _build(doc_path, cache_dir, fake)  # initial index
+
+        mid = args.paragraphs // 2
+        typo = list(base)
+        typo[mid] = typo[mid].replace("Flask", "Flusk", 1)  # same length: chunk boundaries unchanged
+        scenarios = [
+            ("touch", base),
+            ("typo_fix", typo),
+            ("append_paragraph", typo + [_paragraph(args.paragraphs)]),
+            ("insert_paragraph_mid", typo[:mid] + [_paragraph(args.paragraphs + 1)] + typo[mid:]),
+        ]
+        for name, paragraphs in scenarios:
+            time.sleep(1.01)  # _doc_signature uses whole-second mtimes
+            _write_docx(doc_path, paragraphs)
+            incremental = _build(doc_path, cache_dir, fake)
+            fresh = os.path.join(work, f"fresh_{name}")
+            full = _build(doc_path, fresh, fake)
+            shutil.rmtree(fresh, ignore_errors=True)
+            print(json.dumps({
+                "scenario": name, "chunks": incremental["chunks"],
+                "incremental": {k: v for k, v in incremental.items() if k != "chunks"},
+                "full": {k: v for k, v in full.items() if k != "chunks"},
+                "embedding_calls_saved": full["embedding_calls"] - incremental["embedding_calls"],
+                "startup_ms_saved": round(full["startup_ms"] - incremental["startup_ms"], 1),
+            }))
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/bench_ingestion.py
+"""Directory ingestion throughput (parse + chunk) against corpus size and worker count.
+
+    python -m benchmarks.bench_ingestion --files 8 32 128 --workers 1 2 4 8
+
+Generates a corpus of DOCX, TXT and Markdown files (--kb each), then times
+rag_store._ingest with a fresh text cache per run so every DOCX is really parsed.
+Also reports how many embedding requests the corpus needs when batches span
+documents versus one batch series per document.
+"""
+import argparse, json, math, os, shutil, tempfile, time
+
+from docx import Document
+
+from common import rag_store
+from common.config import EMBED_BATCH_SIZE
+
+
+def _write_corpus(root: str, files: int, kb: int):
+    para = "Built retrieval pipelines and voice agents in Python; shipped Flask services. "
+    paragraphs = [f"{i}: {para * 4}" for i in range(max(1, kb * 1024 // (len(para) * 4)))]
+    for i in range(files):
+        kind = ("docx", "txt", "md")[i % 3]
+        path = os.path.join(root, f"doc_{i:04d}.{kind}")
+        if kind == "docx":
+            doc = Document()
+            for p in paragraphs:
+                doc.add_paragraph(p)
+            doc.save(path)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(("# Project notes\n\n" if kind == "md" else "") + "\n\n".join(paragraphs))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, nargs="+", default=[8, 32, 128])
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    ap.add_argument("--kb", type=int, default=32)
+    args = ap.parse_args()
+    work = tempfile.mkdtemp(prefix="bench_ingest_")
+    try:
+        for files in args.files:
+            corpus = os.path.join(work, f"corpus_{files}")
+            os.makedirs(corpus)
+            _write_corpus(corpus, files, args.kb)
+            size_mb = sum(os.path.getsize(os.path.join(corpus, f)) for f in os.listdir(corpus)) / 2**20
+            for workers in args.workers:
+                rag_store.RAG_CACHE_DIR = os.path.join(work, f"cache_{files}_{workers}")
+                t0 = time.perf_counter()
+                chunks = list(rag_store._ingest(corpus, workers=workers))
+                elapsed = time.perf_counter() - t0
+                per_doc = {}
+                for _, meta in chunks:
+                    per_doc[meta["source"]] = per_doc.get(meta["source"], 0) + 1
+                print(json.dumps({
+                    "files": files, "workers": workers, "corpus_mb": round(size_mb, 2), "chunks": len(chunks),
+                    "seconds": round(elapsed, 3), "files_per_s": round(files / elapsed, 1),
+                    "chunks_per_s": round(len(chunks) / elapsed, 1),
+                    "embed_requests_cross_doc": math.ceil(len(chunks) / EMBED_BATCH_SIZE),
+                    "embed_requests_per_doc": sum(math.ceil(n / EMBED_BATCH_SIZE) for n in per_doc.values()),
+                }))
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
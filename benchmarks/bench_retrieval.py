@@ -0,0 +1,174 @@
+# benchmarks/bench_retrieval.py
+"""Retrieval benchmark suite over synthetic corpora (no network).
+
+    python -m benchmarks.bench_retrieval --chunks 1000 10000 100000 --out bench_retrieval.json
+    python -m benchmarks.bench_retrieval --chunks 1000 10000 --baseline bench_retrieval.json
+
+For every index type and corpus size a fresh interpreter generates a Zipf-distributed
+token corpus plus random embeddings, builds the index, and times RagStore.retrieve
+over --queries distinct queries (query embeddings come from a local stand-in for the
+API). Reported per run: build time, index bytes, RSS growth and p50/p90/p99 latency.
+With --baseline, runs slower than the baseline by more than --tolerance exit 1.
+New index types register a builder in INDEX_TYPES.
+"""
+import argparse, json, os, platform, subprocess, sys, time
+from types import SimpleNamespace
+
+import numpy as np
+
+from benchmarks._util import rss_mb, percentile
+
+
+# ---- synthetic corpus ----
+def _corpus(n: int, tokens: int, vocab: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    words = [f"w{i}" for i in range(vocab)]
+    ids = (rng.zipf(1.2, size=(n, tokens)) - 1) % vocab
+    return [[words[i] for i in row] for row in ids.tolist()], words
+
+
+def _queries(count: int, words, dim: int, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    texts = [" ".join(words[i] for i in rng.integers(0, min(len(words), 2000), size=6)) + f" q{j}"
+             for j in range(count)]
+    return texts, {t: v.tolist() for t, v in zip(texts, rng.standard_normal((count, dim)).astype(np.float32))}
+
+
+class _LocalEmbeddings:
+    def __init__(self, table):
+        self.table = table
+
+    def create(self, model, input):
+        return SimpleNamespace(data=[SimpleNamespace(embedding=self.table[t]) for t in input])
+
+
+# ---- index types ----
+def _store(rag_store, mode: str, n: int):
+    store = rag_store.RagStore(path="<synthetic>", mode=mode, build=False)
+    store.results = None  # measure the index, not the semantic result cache
+    store.chunks = [rag_store.RagChunk(text="", meta={"chunk_id": i}) for i in range(n)]
+    return store
+
+
+def _build_dense(rag_store, docs, dim, mode="dense"):
+    store = _store(rag_store, mode, len(docs))
+    vectors = np.random.default_rng(2).standard_normal((len(docs), dim), dtype=np.float32)
+    t0 = time.perf_counter()
+    store._set_dense(vectors)
+    return store, time.perf_counter() - t0
+
+
+def _build_sparse(rag_store, docs, dim, mode="sparse"):
+    store = _store(rag_store, mode, len(docs))
+    t0 = time.perf_counter()
+    store._sparse = rag_store.BM25Index.build(docs, k1=rag_store.BM25_K1, b=rag_store.BM25_B)
+    return store, time.perf_counter() - t0
+
+
+def _build_hybrid(rag_store, docs, dim):
+    store, dense_s = _build_dense(rag_store, docs, dim, mode="hybrid")
+    t0 = time.perf_counter()
+    store._sparse = rag_store.BM25Index.build(docs, k1=rag_store.BM25_K1, b=rag_store.BM25_B)
+    return store, dense_s + time.perf_counter() - t0
+
+
+INDEX_TYPES = {"dense": _build_dense, "sparse": _build_sparse, "hybrid": _build_hybrid}
+
+
+def _index_bytes(store) -> int:
+    total = 0
+    if store._dense is not None:
+        total += store._dense.matrix.nbytes
+    if store._sparse is not None:
+        s = store._sparse
+        total += s.offsets.nbytes + s.doc_ids.nbytes + s.weights.nbytes + sum(len(t) for t in s.terms)
+    return total
+
+
+def run_one(index: str, n: int, dim: int, tokens: int, vocab: int, queries: int, k: int) -> dict:
+    from common import rag_store
+    docs, words = _corpus(n, tokens, vocab)
+    texts, table = _queries(queries, words, dim)
+    rag_store._client = SimpleNamespace(embeddings=_LocalEmbeddings(table))
+    rag_store._query_cache.disk_dir = None
+    before = rss_mb()
+    store, build_s = INDEX_TYPES[index](rag_store, docs, dim)
+    del docs
+    rss = rss_mb() - before
+    store.retrieve(texts[0], k)  # warm-up (thread pools, first-touch pages)
+    lat = []
+    for q in texts[1:]:
+        t0 = time.perf_counter()
+        store.retrieve(q, k)
+        lat.append((time.perf_counter() - t0) * 1000)
+    return {"index": index, "chunks": n, "dim": dim, "k": k, "queries": len(lat),
+            "build_s": round(build_s, 4), "index_mb": round(_index_bytes(store) / 2**20, 2),
+            "rss_growth_mb": round(rss, 1),
+            "p50_ms": round(percentile(lat, 50), 3), "p90_ms": round(percentile(lat, 90), 3),
+            "p99_ms": round(percentile(lat, 99), 3), "mean_ms": round(sum(lat) / len(lat), 3),
+            "dense_deadline_misses": store.dense_deadline_misses, "dense_errors": store.dense_errors}
+
+
+def _compare(results, baseline_path: str, tolerance: float):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        base = {(r["index"], r["chunks"], r["dim"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        old = base.get((r["index"], r["chunks"], r["dim"]))
+        if old is None:
+            continue
+        for metric in ("p50_ms", "p99_ms", "build_s", "index_mb"):
+            if old[metric] and r[metric] > old[metric] * (1 + tolerance):
+                regressions.append({"index": r["index"], "chunks": r["chunks"], "metric": metric,
+                                    "baseline": old[metric], "current": r[metric]})
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--index", nargs="+", choices=sorted(INDEX_TYPES), default=sorted(INDEX_TYPES))
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--tokens", type=int, default=60, help="tokens per synthetic chunk")
+    ap.add_argument("--vocab", type=int, default=50000)
+    ap.add_argument("--queries", type=int, default=300)
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--out", help="write the JSON report here (default: stdout)")
+    ap.add_argument("--baseline", help="earlier report to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    ap.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:  # one (index, size) in this interpreter
+        print(json.dumps(run_one(args.index[0], args.chunks[0], args.dim, args.tokens, args.vocab,
+                                 args.queries, args.k)))
+        return
+
+    results = []
+    for n in args.chunks:
+        for index in args.index:
+            cmd = [sys.executable, "-m", "benchmarks.bench_retrieval", "--worker", "--index", index,
+                   "--chunks", str(n), "--dim", str(args.dim), "--tokens", str(args.tokens),
+                   "--vocab", str(args.vocab), "--queries", str(args.queries), "--k", str(args.k)]
+            out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+            results.append(json.loads(out.strip().splitlines()[-1]))
+            print(json.dumps(results[-1]), file=sys.stderr)
+    report = {"meta": {"python": platform.python_version(), "numpy": np.__version__,
+                       "machine": platform.machine(), "cpus": os.cpu_count(),
+                       "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "params": {k: v for k, v in vars(args).items() if k not in ("worker", "out", "baseline")}},
+              "results": results}
+    if args.baseline:
+        report["regressions"] = _compare(results, args.baseline, args.tolerance)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/bench_sessions.py
+"""Memory and CPU cost per concurrent voice session (no network).
+
+    python -m benchmarks.bench_sessions --sessions 1 5 10 20 --seconds 5
+
+Each session is a real client.VoiceAgent registered in client.SESSIONS; the upstream
+Deepgram websocket is replaced by an in-memory stand-in that swallows mic audio and
+streams 16 kHz TTS PCM back in 100 ms chunks.
+"""
+import argparse, asyncio, json, os, threading, time
+
+import websockets
+
+import client
+from benchmarks._util import rss_mb, cpu_seconds
+from common.config import USER_AUDIO_SAMPLE_RATE
+
+MIC_FRAME = b"\x00\x00" * 2400          # 50 ms of 48 kHz mono linear16
+TTS_CHUNK = b"\x00\x00" * 1600          # 100 ms of 16 kHz mono linear16
+
+
+class _FakeAgentSocket:
+    def __init__(self):
+        self.closed = asyncio.Event()
+        self.bytes_in = 0
+
+    async def send(self, data):
+        if isinstance(data, bytes):
+            self.bytes_in += len(data)
+
+    async def close(self):
+        self.closed.set()
+
+    def __aiter__(self):
+        return self._messages()
+
+    async def _messages(self):
+        while not self.closed.is_set():
+            await asyncio.sleep(0.1)
+            yield TTS_CHUNK
+
+
+async def _fake_connect(url, extra_headers=None):
+    return _FakeAgentSocket()
+
+
+def _run(n: int, seconds: float) -> dict:
+    rss0, cpu0, threads0 = rss_mb(), cpu_seconds(), threading.active_count()
+    agents = []
+    loop = client.start_agent_loop()
+    for i in range(n):
+        sid = f"bench-{n}-{i}"
+        agent = client.SESSIONS.create(sid, lambda sid=sid: client.VoiceAgent(sid))
+        agent.accept_mic_rate(USER_AUDIO_SAMPLE_RATE)  # as the handler does on the first audio_data
+        asyncio.run_coroutine_threadsafe(agent.run(), loop)
+        agents.append(agent)
+    t_end = time.perf_counter() + seconds
+    while time.perf_counter() < t_end:      # browser mic: one 50 ms frame per session
+        for agent in agents:
+            if agent.is_running:
+                asyncio.run_coroutine_threadsafe(agent.mic_audio_queue.put(MIC_FRAME), loop)
+        time.sleep(0.05)
+    rss1, cpu1, threads1 = rss_mb(), cpu_seconds(), threading.active_count()
+    for agent in agents:
+        client.SESSIONS.remove(agent.sid)
+    time.sleep(0.3)
+    return {
+        "sessions": n,
+        "rss_mb_per_session": round((rss1 - rss0) / n, 3),
+        "cpu_pct_per_session": round(100.0 * (cpu1 - cpu0) / seconds / n, 3),
+        "threads_per_session": round((threads1 - threads0) / n, 2),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10, 20])
+    ap.add_argument("--seconds", type=float, default=5.0)
+    args = ap.parse_args()
+    os.environ.setdefault("DEEPGRAM_API_KEY", "bench")
+    websockets.connect = _fake_connect
+    client.SESSIONS.max_sessions = max(args.sessions)
+    client.AGENT_POOL.target_size = 0  # measure sessions alone, without warm spares
+    for n in args.sessions:
+        print(json.dumps(_run(n, args.seconds)))
+
+
+if __name__ == "__main__":
+    main()
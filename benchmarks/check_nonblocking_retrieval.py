@@ -0,0 +1,98 @@
+# benchmarks/check_nonblocking_retrieval.py
+"""Shows that mic frames keep flowing on the agent loop while retrieve_context waits
+on a slow embedding request. Exits non-zero if the loop stalls.
+
+    python -m benchmarks.check_nonblocking_retrieval --delay 1.0
+
+tests/test_nonblocking_retrieval.py asserts the same under pytest; this script
+also reports the frame gap of the blocking path for comparison.
+"""
+import argparse, asyncio, json, sys, tempfile, time, types
+import numpy as np
+
+from common import rag_store
+from common.agent_functions import retrieve_context
+
+FRAME_S = 0.02
+MAX_GAP_S = 0.1
+
+
+class _SlowEmbeddings:
+    def __init__(self, delay: float, dim: int = 64):
+        self.delay, self.dim = delay, dim
+        self._rng = np.random.default_rng(0)
+
+    def _resp(self, inputs):
+        return types.SimpleNamespace(data=[
+            types.SimpleNamespace(embedding=self._rng.standard_normal(self.dim).tolist()) for _ in inputs])
+
+    def create(self, model, input):
+        time.sleep(self.delay)
+        return self._resp(input)
+
+
+class _AsyncSlowEmbeddings(_SlowEmbeddings):
+    async def create(self, model, input):
+        await asyncio.sleep(self.delay)
+        return self._resp(input)
+
+
+async def _pump_frames(stop: asyncio.Event, gaps: list):
+    """Stand-in for VoiceAgent.sender: one 20 ms mic frame per tick."""
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(FRAME_S)
+        now = time.perf_counter()
+        gaps.append(now - last)
+        last = now
+
+
+async def _run(lookup) -> float:
+    stop, gaps = asyncio.Event(), []
+    pump = asyncio.ensure_future(_pump_frames(stop, gaps))
+    await asyncio.sleep(FRAME_S * 3)
+    await lookup()
+    stop.set()
+    await pump
+    return max(gaps)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--delay", type=float, default=1.0, help="simulated embedding latency (s)")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as d, tempfile.NamedTemporaryFile("w", suffix=".txt") as doc:
+        doc.write("Shubham built a voice portfolio with retrieval. " * 400)
+        doc.flush()
+        rag_store.RAG_CACHE_DIR = d
+        rag_store._query_cache.disk_dir = None
+        rag_store._client = types.SimpleNamespace(embeddings=_SlowEmbeddings(0.0))
+        rag_store._store = rag_store.RagStore(doc.name)
+        rag_store._client.embeddings.delay = args.delay
+        slow_async = types.SimpleNamespace(embeddings=_AsyncSlowEmbeddings(args.delay))
+        rag_store._async_client = lambda: slow_async
+
+        async def blocking():
+            rag_store._store.retrieve("what did he build?")
+
+        outcome = {}
+
+        async def nonblocking():
+            res = await retrieve_context({"query": "which projects has he done?"})
+            outcome["result"] = res.get("error") or f"{len(res['results'])} passages"
+
+        blocked_gap = asyncio.run(_run(blocking))
+        free_gap = asyncio.run(_run(nonblocking))
+
+    ok = free_gap < MAX_GAP_S
+    print(json.dumps({"embed_delay_s": args.delay,
+                      "max_frame_gap_ms_blocking_retrieve": round(blocked_gap * 1000, 1),
+                      "max_frame_gap_ms_retrieve_context": round(free_gap * 1000, 1),
+                      "retrieve_context": outcome.get("result"),
+                      "ok": ok}))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# benchmarks/fake_agent.py
+"""Local stand-in for the Deepgram agent websocket (no network, no API key).
+
+    python -m benchmarks.fake_agent --port 8765 --utterance 2.0 --think-delay 0.3
+    VOICE_AGENT_URL=ws://127.0.0.1:8765 DEEPGRAM_API_KEY=local python client.py
+
+Speaks the part of the agent protocol VoiceAgent uses. After Settings it sends
+Welcome, SettingsApplied and the greeting (text, PCM, AgentAudioDone). Every
+--utterance seconds of binary mic audio received is treated as one user turn:
+UserStartedSpeaking, the user's ConversationText, a FunctionCallRequest, and once
+the FunctionCallResponse arrives, the assistant's ConversationText, --reply
+seconds of synthetic PCM in --chunk-ms chunks paced in real time, and
+AgentAudioDone. Rates come from the Settings message.
+"""
+import argparse, asyncio, json, logging, math, struct
+
+import websockets
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMING = {
+    "utterance": 2.0,         # seconds of mic audio per user turn
+    "transcript_delay": 0.2,  # UserStartedSpeaking -> user ConversationText
+    "think_delay": 0.3,       # user ConversationText -> FunctionCallRequest
+    "speak_delay": 0.2,       # FunctionCallResponse -> first reply audio
+    "greeting": 1.0,          # seconds of greeting audio
+    "reply": 2.0,             # seconds of reply audio
+    "chunk_ms": 100,          # TTS chunk duration
+    "response_timeout": 5.0,  # give up waiting for a FunctionCallResponse
+}
+FUNCTION_ARGS = {
+    "agent_filler": {"message_type": "lookup"},
+    "retrieve_context": {"query": "What did Shubham build with retrieval?", "k": 5},
+}
+
+
+def _tone(sample_rate: int, seconds: float, freq: float = 220.0) -> bytes:
+    """linear16 mono sine; repeated to fill replies."""
+    n = int(sample_rate * seconds)
+    return struct.pack(f"<{n}h", *(int(3000 * math.sin(2 * math.pi * freq * i / sample_rate)) for i in range(n)))
+
+
+class FakeAgentSession:
+    """One agent websocket: turns are driven by the amount of mic audio received."""
+
+    def __init__(self, ws, timing: dict, function: str):
+        self.ws = ws
+        self.timing = timing
+        self.function = function
+        self.input_rate = 16000
+        self.output_rate = 16000
+        self.heard = 0
+        self.turns = 0
+        self.turn: asyncio.Task = None
+        self.responses = {}  # call id -> Future resolved by FunctionCallResponse
+
+    async def send_json(self, msg: dict):
+        await self.ws.send(json.dumps(msg))
+
+    async def speak(self, seconds: float):
+        chunk_s = self.timing["chunk_ms"] / 1000.0
+        chunk = _tone(self.output_rate, chunk_s)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for i in range(max(1, round(seconds / chunk_s))):
+            await self.ws.send(chunk)
+            await asyncio.sleep(max(0.0, start + (i + 1) * chunk_s - loop.time()))  # real-time pacing
+        await self.send_json({"type": "AgentAudioDone"})
+
+    async def greet(self):
+        await self.send_json({"type": "Welcome", "request_id": "fake-agent"})
+        await self.send_json({"type": "SettingsApplied"})
+        await self.send_json({"type": "ConversationText", "role": "assistant", "content": "Hello from the fake agent."})
+        await self.speak(self.timing["greeting"])
+
+    async def run_turn(self, n: int):
+        t = self.timing
+        await self.send_json({"type": "UserStartedSpeaking"})
+        await asyncio.sleep(t["transcript_delay"])
+        await self.send_json({"type": "ConversationText", "role": "user",
+                              "content": f"What did Shubham build with retrieval, part {n}?"})
+        await asyncio.sleep(t["think_delay"])
+        call_id = f"call-{n}"
+        self.responses[call_id] = asyncio.get_running_loop().create_future()
+        await self.send_json({"type": "FunctionCallRequest", "functions": [{
+            "id": call_id, "name": self.function, "client_side": True,
+            "arguments": json.dumps(FUNCTION_ARGS.get(self.function, {}))}]})
+        try:
+            await asyncio.wait_for(self.responses[call_id], t["response_timeout"])
+        except asyncio.TimeoutError:
+            logger.warning(f"fake agent: no FunctionCallResponse for {call_id}")
+        finally:
+            self.responses.pop(call_id, None)
+        await asyncio.sleep(t["speak_delay"])
+        await self.send_json({"type": "ConversationText", "role": "assistant", "content": f"Here is answer {n}."})
+        await self.speak(t["reply"])
+
+    def on_text(self, msg: dict):
+        kind = msg.get("type")
+        if kind == "Settings":
+            audio = msg.get("audio", {})
+            self.input_rate = audio.get("input", {}).get("sample_rate", self.input_rate)
+            self.output_rate = audio.get("output", {}).get("sample_rate", self.output_rate)
+            asyncio.ensure_future(self.greet())
+        elif kind == "FunctionCallResponse":
+            fut = self.responses.get(msg.get("id"))
+            if fut is not None and not fut.done():
+                fut.set_result(msg)
+
+    def on_audio(self, data: bytes):
+        if self.turn is not None and not self.turn.done():
+            return  # the agent is answering; audio meanwhile is not a new turn
+        self.heard += len(data)
+        if self.heard >= 2 * self.input_rate * self.timing["utterance"]:
+            self.heard = 0
+            self.turns += 1
+            self.turn = asyncio.ensure_future(self.run_turn(self.turns))
+
+    async def serve(self):
+        try:
+            async for message in self.ws:
+                if isinstance(message, bytes):
+                    self.on_audio(message)
+                else:
+                    try:
+                        self.on_text(json.loads(message))
+                    except ValueError:
+                        continue
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if self.turn is not None:
+                self.turn.cancel()
+
+
+async def serve(host: str, port: int, timing: dict, function: str):
+    async def handler(ws, path=None):
+        await FakeAgentSession(ws, timing, function).serve()
+
+    async with websockets.serve(handler, host, port, max_size=None):
+        logger.info(f"fake agent listening on ws://{host}:{port}")
+        await asyncio.Future()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--function", default="agent_filler", help="function named in each FunctionCallRequest")
+    for name, default in DEFAULT_TIMING.items():
+        ap.add_argument("--" + name.replace("_", "-"), type=type(default), default=default)
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    timing = {name: getattr(args, name) for name in DEFAULT_TIMING}
+    try:
+        asyncio.run(serve(args.host, args.port, timing, args.function))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# benchmarks/load_sessions.py
+"""Concurrent-session load test of app.py or client.py against the local fake agent.
+
+    python -m benchmarks.load_sessions --server app --sessions 1 5 10 20 --seconds 20
+    python -m benchmarks.load_sessions --url http://127.0.0.1:5000 --pid 4242 --sessions 10
+
+With --server the fake agent (benchmarks.fake_agent) and the chosen server are
+started as subprocesses, the server pointed at the fake agent via VOICE_AGENT_URL.
+With --url an already running server is used (give --pid for CPU/memory).
+
+Each simulated browser is a python-socketio client that starts a voice session
+and streams 50 ms mic frames in real time, encoded with --codec when the server
+accepts it; --framing binary asks for TTS as packed "audio_frames" events. Per load level the run reports sessions
+started/rejected, greeting latency (start_voice_agent to first audio_output), turn
+latency (user transcript to first reply audio_output, which includes the fake
+agent's --think-delay and --speak-delay) and the server's CPU and RSS.
+"sessions_per_node" is the largest level with no rejections, every session
+answered, turn p99 within --slo-ms and server CPU under --max-cpu percent.
+"""
+import argparse, json, os, socket, subprocess, sys, threading, time
+
+import socketio
+from engineio.payload import Payload
+
+from benchmarks._util import percentile, proc_cpu_seconds, proc_rss_mb
+from benchmarks.fake_agent import DEFAULT_TIMING
+from common.audio_codec import CODECS
+from common.audio_framing import unpack_frames
+from common.config import USER_AUDIO_SAMPLE_RATE, USER_AUDIO_SECS_PER_CHUNK
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIC_FRAME = b"\x00\x00" * round(USER_AUDIO_SAMPLE_RATE * USER_AUDIO_SECS_PER_CHUNK)
+# a replayed greeting arrives as one burst; the polling client otherwise aborts past 16 packets
+Payload.max_decode_packets = 1024
+# no debug reloader, so the measured pid is the server itself
+_RUN_SERVER = ("import os, {0} as s; "
+               "s.socketio.run(s.app, port=int(os.environ['PORT']), debug=False, allow_unsafe_werkzeug=True)")
+
+
+class SimulatedBrowser:
+    """One Socket.IO client playing the role of index.html."""
+
+    def __init__(self, url: str, codec: str = "linear16", framing: str = "json"):
+        self.url = url
+        self.codec = codec
+        self.framing = framing
+        self.mic_codec = "linear16"  # until the server answers with audio_codec
+        self.mic_frames = {name: c.encode(MIC_FRAME) for name, c in CODECS.items()}
+        self.sio = socketio.Client(reconnection=False)
+        self.started_at = None
+        self.greeting_ms = None
+        self.user_text_at = None
+        self.turn_ms = []
+        self.audio_chunks = 0
+        self.audio_bytes = 0
+        self.audio_events = 0
+        self.rejected = False
+        self.sio.on("audio_output", self._on_audio)
+        self.sio.on("audio_frames", self._on_frames)
+        self.sio.on("conversation_update", self._on_text)
+        self.sio.on("session_error", self._on_error)
+        self.sio.on("audio_codec", self._on_codec)
+
+    def _on_audio(self, data):
+        self.audio_chunks += 1
+        self.audio_bytes += len(data.get("audio") or b"")
+        self._heard()
+
+    def _on_frames(self, data):
+        frames = unpack_frames(data)
+        self.audio_chunks += len(frames)
+        self.audio_bytes += len(data)
+        self._heard()
+
+    def _heard(self):
+        now = time.perf_counter()
+        self.audio_events += 1
+        if self.greeting_ms is None and self.started_at is not None:
+            self.greeting_ms = (now - self.started_at) * 1000
+        if self.user_text_at is not None:
+            self.turn_ms.append((now - self.user_text_at) * 1000)
+            self.user_text_at = None
+
+    def _on_text(self, msg):
+        if msg.get("role") == "user":
+            self.user_text_at = time.perf_counter()
+
+    def _on_error(self, msg):
+        self.rejected = True
+
+    def _on_codec(self, msg):
+        self.mic_codec = msg.get("input", "linear16")
+
+    def start(self):
+        self.sio.connect(self.url, wait_timeout=10)
+        self.started_at = time.perf_counter()
+        self.sio.emit("start_voice_agent", {"voiceModel": "aura-2-apollo-en", "voiceName": "", "codecs": [self.codec],
+                                             "framing": self.framing})
+
+    def send_mic(self):
+        if self.sio.connected and not self.rejected:
+            self.sio.emit("audio_data", {"audio": self.mic_frames[self.mic_codec], "codec": self.mic_codec,
+                                         "samples": len(MIC_FRAME) // 2, "sampleRate": USER_AUDIO_SAMPLE_RATE})
+
+    def stop(self):
+        try:
+            if self.sio.connected:
+                self.sio.emit("stop_voice_agent")
+            self.sio.disconnect()
+        except Exception:
+            pass
+
+
+def _level(url: str, pid, n: int, seconds: float, codec: str = "linear16", framing: str = "json") -> dict:
+    cpu0 = proc_cpu_seconds(pid) if pid else None
+    rss0 = proc_rss_mb(pid) if pid else None
+    browsers = [SimulatedBrowser(url, codec, framing) for _ in range(n)]
+    starters = [threading.Thread(target=b.start) for b in browsers]
+    for t in starters:
+        t.start()
+    for t in starters:
+        t.join()
+    t0 = time.perf_counter()
+    peak_rss = rss0
+    tick = 0
+    while time.perf_counter() - t0 < seconds:  # every browser sends one mic frame per tick
+        for b in browsers:
+            b.send_mic()
+        tick += 1
+        if pid and tick % 20 == 0:
+            peak_rss = max(peak_rss, proc_rss_mb(pid))
+        time.sleep(max(0.0, t0 + tick * USER_AUDIO_SECS_PER_CHUNK - time.perf_counter()))
+    elapsed = time.perf_counter() - t0
+    cpu1 = proc_cpu_seconds(pid) if pid else None
+    for b in browsers:
+        b.stop()
+    started = [b for b in browsers if b.greeting_ms is not None]
+    greeting = [b.greeting_ms for b in started]
+    turns = [ms for b in browsers for ms in b.turn_ms]
+    result = {
+        "sessions": n, "codec": codec, "framing": framing, "started": len(started), "rejected": sum(b.rejected for b in browsers),
+        "answered": sum(1 for b in browsers if b.turn_ms), "turns": len(turns),
+        "greeting_p50_ms": round(percentile(greeting, 50), 1), "greeting_p99_ms": round(percentile(greeting, 99), 1),
+        "turn_p50_ms": round(percentile(turns, 50), 1), "turn_p90_ms": round(percentile(turns, 90), 1),
+        "turn_p99_ms": round(percentile(turns, 99), 1),
+        "audio_chunks_per_s": round(sum(b.audio_chunks for b in browsers) / elapsed, 1),
+        "audio_events_per_s": round(sum(b.audio_events for b in browsers) / elapsed, 1),
+        "audio_kb_per_s_per_session": round(sum(b.audio_bytes for b in browsers) / elapsed / n / 1000, 2),
+    }
+    if pid:
+        result.update({"server_cpu_pct": round(100.0 * (cpu1 - cpu0) / elapsed, 1),
+                       "server_rss_mb": round(peak_rss, 1),
+                       "server_rss_mb_per_session": round((peak_rss - rss0) / n, 2)})
+    return result
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_port(port: int, proc, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"process exited with {proc.returncode} before listening on {port}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"nothing listening on port {port} after {timeout:.0f}s")
+
+
+def _spawn(args):
+    """Start the fake agent and the server; returns (url, server pid, processes)."""
+    agent_port, server_port = _free_port(), _free_port()
+    timing = [f"--{k.replace('_', '-')}={getattr(args, k)}" for k in DEFAULT_TIMING]
+    agent = subprocess.Popen([sys.executable, "-m", "benchmarks.fake_agent", "--port", str(agent_port),
+                              "--function", args.function] + timing, cwd=_ROOT, stderr=subprocess.DEVNULL)
+    procs = [agent]
+    _wait_port(agent_port, agent)
+    env = dict(os.environ, PORT=str(server_port), VOICE_AGENT_URL=f"ws://127.0.0.1:{agent_port}")
+    env.setdefault("DEEPGRAM_API_KEY", "load-test")
+    server = subprocess.Popen([sys.executable, "-c", _RUN_SERVER.format(args.server)], cwd=_ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL)
+    procs.append(server)
+    _wait_port(server_port, server)
+    return f"http://127.0.0.1:{server_port}", server.pid, procs
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--server", choices=["client", "app"], default="app", help="server module to start")
+    ap.add_argument("--url", help="use an already running server instead of starting one")
+    ap.add_argument("--pid", type=int, help="pid of the --url server, for CPU/memory")
+    ap.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10, 20])
+    ap.add_argument("--seconds", type=float, default=20.0)
+    ap.add_argument("--slo-ms", type=float, default=1500.0, help="turn p99 budget for sessions_per_node")
+    ap.add_argument("--max-cpu", type=float, default=80.0 * (os.cpu_count() or 1))
+    ap.add_argument("--function", default="agent_filler", help="function the fake agent calls each turn")
+    ap.add_argument("--codec", choices=sorted(CODECS), default="linear16", help="audio codec the browsers offer")
+    ap.add_argument("--framing", choices=["json", "binary"], default="json", help="TTS audio framing to ask for")
+    ap.add_argument("--verbose", action="store_true", help="show the server's log output")
+    for name, default in DEFAULT_TIMING.items():
+        ap.add_argument("--" + name.replace("_", "-"), type=type(default), default=default)
+    args = ap.parse_args()
+
+    procs = []
+    try:
+        if args.url:
+            url, pid = args.url, args.pid
+        else:
+            url, pid, procs = _spawn(args)
+        results = []
+        for n in args.sessions:
+            results.append(_level(url, pid, n, args.seconds, args.codec, args.framing))
+            print(json.dumps(results[-1]))
+            time.sleep(1.0)  # let the server tear the sessions down
+        ok = [r["sessions"] for r in results
+              if r["rejected"] == 0 and r["answered"] == r["sessions"] and r["turn_p99_ms"] <= args.slo_ms
+              and r.get("server_cpu_pct", 0.0) <= args.max_cpu]
+        print(json.dumps({"server": args.url or args.server, "cpus": os.cpu_count(),
+                          "sessions_per_node": max(ok) if ok else 0}))
+    finally:
+        for p in reversed(procs):
+            p.terminate()
+            try:
+                p.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,31 @@
 # common/agent_functions.py
-from .rag_store import get_store
+import asyncio
+from .config import RETRIEVE_TIMEOUT
+from .rag_store import aget_store
 
 # --- RAG tool ---
-async def retrieve_context(params):
+async def _retrieve(query, k):
+    store = await aget_store()
+    return await store.aretrieve(query, k=k)
+
+async def _retrieve_prefetched(query, k, prefetcher):
+    hits = await prefetcher.take(query, k)
+    if hits is None:
+        hits = await _retrieve(query, k)
+    return hits
+
+async def retrieve_context(params, prefetcher=None):
     query = params.get("query", "")
     k = int(params.get("k", 5))
     if not query.strip():
         return {"error": "query is required"}
-    store = get_store()
-    hits = store.retrieve(query, k=k)
+    try:
+        if prefetcher is not None:
+            hits = await asyncio.wait_for(_retrieve_prefetched(query, k, prefetcher), RETRIEVE_TIMEOUT)
+        else:
+            hits = await asyncio.wait_for(_retrieve(query, k), RETRIEVE_TIMEOUT)
+    except asyncio.TimeoutError:
+        return {"query": query, "error": "retrieval timed out"}
     results = [
         {"chunk_id": c.meta["chunk_id"], "score": round(score, 4), "text": c.text}
         for (c, score) in hits if score > 0
@@ -0,0 +1,191 @@
+# common/agent_pool.py
+import asyncio, json, logging, os, time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from .agent_templates import VOICE, VOICE_AGENT_URL, settings_json
+from .config import (
+    AGENT_POOL_SIZE, AGENT_POOL_IDLE_TTL, AGENT_POOL_HEALTH_INTERVAL, AGENT_POOL_MAX_BACKLOG, AGENT_POOL_MAX_BACKOFF
+)
+
+logger = logging.getLogger(__name__)
+
+KEEP_ALIVE = json.dumps({"type": "KeepAlive"})
+
+
+async def connect_agent(voice_model: str = VOICE, url: str = VOICE_AGENT_URL):
+    """Open an agent websocket and send the (cached) Settings for voice_model."""
+    dg_api_key = os.environ.get("DEEPGRAM_API_KEY")
+    if not dg_api_key:
+        raise RuntimeError("DEEPGRAM_API_KEY env var not present")
+    import websockets  # deferred: not needed until the first agent connection
+    ws = await websockets.connect(url, extra_headers={"Authorization": f"Token {dg_api_key}"})
+    await ws.send(settings_json(voice_model))
+    return ws
+
+
+class PooledConnection:
+    """A configured agent websocket waiting for a visitor.
+
+    Until it is handed out, a reader task drains the socket into ``backlog``
+    (SettingsApplied, the greeting text and audio) so the session can replay it.
+    """
+
+    def __init__(self, ws, voice_model: str, max_backlog: int = AGENT_POOL_MAX_BACKLOG):
+        self.ws = ws
+        self.voice_model = voice_model
+        self.created = time.monotonic()
+        self.backlog: Deque = deque()
+        self.max_backlog = max_backlog
+        self._reader = asyncio.ensure_future(self._drain())
+
+    async def _drain(self):
+        try:
+            async for message in self.ws:
+                self.backlog.append(message)
+                if len(self.backlog) > self.max_backlog:
+                    logger.warning("agent pool: backlog overflow, dropping connection")
+                    break
+        except Exception:
+            pass
+
+    @property
+    def healthy(self) -> bool:
+        return self.ws.open and not self._reader.done()
+
+    async def detach(self) -> List:
+        """Stop draining and return the buffered messages; the ws belongs to the caller now."""
+        self._reader.cancel()
+        try:
+            await self._reader
+        except asyncio.CancelledError:
+            pass
+        return list(self.backlog)
+
+    async def close(self):
+        self._reader.cancel()
+        try:
+            await self.ws.close()
+        except Exception:
+            pass
+
+
+class AgentConnectionPool:
+    """Pre-connected, pre-configured agent websockets keyed by voice model.
+
+    Lives on the shared agent loop. Keeps ``target_size`` idle connections for
+    every voice requested within ``idle_ttl`` (the default voice counts as
+    requested when the pool starts), so the pool winds down without visitors.
+    Idle connections older than ``idle_ttl`` are recycled, and every health check
+    sends a KeepAlive and drops sockets that have closed. Failed warm connects
+    back off exponentially up to ``max_backoff`` seconds per voice.
+    """
+
+    def __init__(self, target_size: int = AGENT_POOL_SIZE, idle_ttl: float = AGENT_POOL_IDLE_TTL,
+                 health_interval: float = AGENT_POOL_HEALTH_INTERVAL, url: str = VOICE_AGENT_URL,
+                 default_voice: str = VOICE, max_backoff: float = AGENT_POOL_MAX_BACKOFF):
+        self.target_size = target_size
+        self.idle_ttl = idle_ttl
+        self.health_interval = health_interval
+        self.url = url
+        self.default_voice = default_voice
+        self.max_backoff = max_backoff
+        self._idle: Dict[str, Deque[PooledConnection]] = {}
+        self._wanted: Dict[str, float] = {}   # voice model -> last requested (monotonic)
+        self._filling: Dict[str, asyncio.Task] = {}
+        self._failures: Dict[str, int] = {}     # voice model -> consecutive failed warm connects
+        self._retry_at: Dict[str, float] = {}   # voice model -> no warm connect before (monotonic)
+        self._maintainer: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    def start(self):
+        """Begin warming; must be called on the agent loop."""
+        if self.target_size <= 0 or self._maintainer is not None:
+            return
+        self._wanted[self.default_voice] = time.monotonic()
+        self._maintainer = asyncio.ensure_future(self._maintain())
+        self._refill(self.default_voice)
+
+    async def acquire(self, voice_model: str):
+        """Return (ws, backlog) of a ready connection, or None if none is warm."""
+        self._wanted[voice_model] = max(self._wanted.get(voice_model, 0.0), time.monotonic())
+        idle = self._idle.get(voice_model)
+        conn = None
+        while idle:
+            candidate = idle.popleft()
+            if candidate.healthy:
+                conn = candidate
+                break
+            await candidate.close()
+        if self._maintainer is not None:
+            self._refill(voice_model)
+        if conn is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return conn.ws, await conn.detach()
+
+    def _refill(self, voice_model: str):
+        if time.monotonic() < self._retry_at.get(voice_model, 0.0):
+            return
+        task = self._filling.get(voice_model)
+        if task is None or task.done():
+            self._filling[voice_model] = asyncio.ensure_future(self._fill(voice_model))
+
+    async def _fill(self, voice_model: str):
+        idle = self._idle.setdefault(voice_model, deque())
+        while len(idle) < self.target_size:
+            try:
+                ws = await connect_agent(voice_model, self.url)
+            except Exception as e:
+                failures = self._failures[voice_model] = self._failures.get(voice_model, 0) + 1
+                delay = min(self.max_backoff, self.health_interval * 2 ** (failures - 1))
+                self._retry_at[voice_model] = time.monotonic() + delay
+                if failures & (failures - 1) == 0:  # 1st, 2nd, 4th, 8th... failure only
+                    logger.warning(f"agent pool: warm connect failed for {voice_model} ({failures}x): {e}; "
+                                   f"retrying in {delay:.0f}s")
+                return
+            if self._failures.pop(voice_model, 0):
+                self._retry_at.pop(voice_model, None)
+                logger.info(f"agent pool: warm connects for {voice_model} recovered")
+            idle.append(PooledConnection(ws, voice_model))
+
+    async def _maintain(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            now = time.monotonic()
+            for voice_model, idle in list(self._idle.items()):
+                # connections stay in the deque while we await, so acquire() can still
+                # take them and _fill() sees the true pool size; drops are synchronous
+                for conn in list(idle):
+                    if conn not in idle:
+                        continue  # handed out meanwhile
+                    if now - conn.created <= self.idle_ttl and conn.healthy:
+                        try:
+                            await conn.ws.send(KEEP_ALIVE)
+                            continue
+                        except Exception:
+                            pass
+                    if conn in idle:
+                        idle.remove(conn)
+                        await conn.close()
+                if now - self._wanted.get(voice_model, 0.0) <= self.idle_ttl:
+                    self._refill(voice_model)
+                else:
+                    self._wanted.pop(voice_model, None)
+                    if not idle:
+                        del self._idle[voice_model]
+
+    async def close(self):
+        if self._maintainer is not None:
+            self._maintainer.cancel()
+            self._maintainer = None
+        for task in self._filling.values():
+            task.cancel()
+        for idle in self._idle.values():
+            while idle:
+                await idle.popleft().close()
+
+    def stats(self) -> dict:
+        return {"idle": {m: len(q) for m, q in self._idle.items()}, "hits": self.hits, "misses": self.misses}
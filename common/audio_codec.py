@@ -0,0 +1,165 @@
+# common/audio_codec.py
+from typing import Iterable, Optional
+import numpy as np
+from .config import AUDIO_CODECS, ADPCM_BLOCK_SAMPLES
+
+# IMA-ADPCM tables (step sizes and index adjustment per 3-bit magnitude)
+IMA_STEPS = np.array([
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45, 50, 55, 60, 66, 73, 80, 88, 97,
+    107, 118, 130, 143, 157, 173, 190, 209, 230, 253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796,
+    876, 963, 1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327, 3660, 4026, 4428, 4871,
+    5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442, 11487, 12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623,
+    27086, 29794, 32767], dtype=np.int32)
+IMA_INDEX = np.array([-1, -1, -1, -1, 2, 4, 6, 8], dtype=np.int32)
+
+
+def _ima_tables():
+    """Per (step index, 4-bit code) predictor delta and next step index, flattened as index * 16 + code."""
+    step = IMA_STEPS[:, None]
+    code = np.arange(16, dtype=np.int32)[None, :]
+    mag = (step >> 3) + ((code >> 2) & 1) * step + ((code >> 1) & 1) * (step >> 1) + (code & 1) * (step >> 2)
+    delta = np.where(code & 8, -mag, mag)
+    nxt = np.clip(np.arange(89, dtype=np.int32)[:, None] + IMA_INDEX[code & 7], 0, 88)
+    return delta.reshape(-1).astype(np.int32), (nxt * 16).reshape(-1).astype(np.int32)
+
+
+# the per-sample recurrence is two table lookups; the state is kept as index * 16
+_IMA_DELTA, _IMA_NEXT = _ima_tables()
+_IMA_STEP_BY_STATE = np.repeat(IMA_STEPS, 16)
+
+_ULAW_BIAS, _ULAW_CLIP = 0x84, 32635
+_ULAW_EXP = np.array([0] + [int(v).bit_length() - 1 for v in range(1, 256)], dtype=np.int32)  # floor(log2(s >> 7))
+
+
+def _samples(pcm: bytes) -> np.ndarray:
+    return np.frombuffer(pcm[: len(pcm) - len(pcm) % 2], dtype="<i2")
+
+
+class Linear16Codec:
+    """Raw little-endian int16 PCM (no compression)."""
+    name = "linear16"
+
+    def encode(self, pcm: bytes) -> bytes:
+        return pcm[: len(pcm) - len(pcm) % 2]  # whole samples, like the other codecs
+
+    def decode(self, data: bytes, samples: Optional[int] = None) -> bytes:
+        return data
+
+    def encoded_size(self, samples: int) -> int:
+        return 2 * samples
+
+
+class MuLawCodec:
+    """G.711 mu-law: 8 bits per sample, table decode, vectorized encode."""
+    name = "mulaw"
+
+    def __init__(self):
+        u = ~np.arange(256, dtype=np.int32) & 0xFF
+        mag = ((((u & 0x0F) << 3) + _ULAW_BIAS) << ((u >> 4) & 0x07)) - _ULAW_BIAS
+        self._table = np.where(u & 0x80, -mag, mag).astype("<i2")
+
+    def encode(self, pcm: bytes) -> bytes:
+        x = _samples(pcm).astype(np.int32)
+        sign = (x < 0).astype(np.int32) << 7
+        mag = np.minimum(np.abs(x), _ULAW_CLIP) + _ULAW_BIAS
+        exp = _ULAW_EXP[mag >> 7]
+        mantissa = (mag >> (exp + 3)) & 0x0F
+        return (~(sign | (exp << 4) | mantissa) & 0xFF).astype(np.uint8).tobytes()
+
+    def decode(self, data: bytes, samples: Optional[int] = None) -> bytes:
+        return self._table[np.frombuffer(data, dtype=np.uint8)].tobytes()
+
+    def encoded_size(self, samples: int) -> int:
+        return samples
+
+
+class ImaAdpcmCodec:
+    """IMA-ADPCM in independent blocks of ``block`` samples (4 bits per sample).
+
+    Block layout: int16 first sample, uint8 step index, one pad byte, then
+    ``(block - 1) / 2`` bytes of 4-bit codes, low nibble first. Blocks carry their
+    own state, so a packet decodes on its own and the codec is vectorized across
+    blocks: the recurrence runs ``block`` steps over all blocks of a packet at once.
+    The last block is padded; ``samples`` trims it on decode.
+    """
+    name = "ima_adpcm"
+
+    def __init__(self, block: int = ADPCM_BLOCK_SAMPLES):
+        if block < 3 or block % 2 == 0:
+            raise ValueError("ADPCM block size must be odd and at least 3")
+        self.block = block
+        self.block_bytes = 4 + (block - 1) // 2
+
+    def encode(self, pcm: bytes) -> bytes:
+        x = _samples(pcm).astype(np.int32)
+        if not len(x):
+            return b""
+        nb = -(-len(x) // self.block)
+        blocks = np.pad(x, (0, nb * self.block - len(x)), mode="edge").reshape(nb, self.block)
+        pred = blocks[:, 0].copy()
+        # start each block at the step size matching its opening slope
+        slope = np.abs(np.diff(blocks[:, : min(9, self.block)], axis=1)).mean(axis=1)
+        index = np.clip(np.searchsorted(IMA_STEPS, slope), 0, 88).astype(np.int32)
+        out = np.zeros((nb, self.block_bytes), dtype=np.uint8)
+        out[:, 0:2] = pred.astype("<i2").view(np.uint8).reshape(nb, 2)
+        out[:, 2] = index
+        codes = np.empty((nb, self.block - 1), dtype=np.int32)
+        state = index * 16
+        for t in range(1, self.block):
+            diff = blocks[:, t] - pred
+            code = np.minimum((np.abs(diff) << 2) // _IMA_STEP_BY_STATE[state], 7)
+            code |= (diff < 0) << 3
+            k = state + code
+            pred = np.minimum(np.maximum(pred + _IMA_DELTA[k], -32768), 32767)
+            state = _IMA_NEXT[k]
+            codes[:, t - 1] = code
+        out[:, 4:] = codes[:, 0::2] | (codes[:, 1::2] << 4)
+        return out.tobytes()
+
+    def decode(self, data: bytes, samples: Optional[int] = None) -> bytes:
+        nb = len(data) // self.block_bytes
+        if not nb:
+            return b""
+        raw = np.frombuffer(data, dtype=np.uint8)[: nb * self.block_bytes].reshape(nb, self.block_bytes)
+        pred = raw[:, 0:2].copy().view("<i2").reshape(nb).astype(np.int32)
+        index = np.clip(raw[:, 2].astype(np.int32), 0, 88)
+        body = raw[:, 4:].astype(np.int32)
+        codes = np.empty((nb, self.block - 1), dtype=np.int32)
+        codes[:, 0::2] = body & 0x0F
+        codes[:, 1::2] = body >> 4
+        out = np.empty((nb, self.block), dtype=np.int32)
+        out[:, 0] = pred
+        state = index * 16
+        for t in range(1, self.block):
+            k = state + codes[:, t - 1]
+            pred = np.minimum(np.maximum(pred + _IMA_DELTA[k], -32768), 32767)
+            state = _IMA_NEXT[k]
+            out[:, t] = pred
+        out = out.reshape(-1)
+        if samples is not None:
+            out = out[:samples]
+        return out.astype("<i2").tobytes()
+
+    def encoded_size(self, samples: int) -> int:
+        return -(-samples // self.block) * self.block_bytes
+
+
+CODECS = {codec.name: codec for codec in (Linear16Codec(), MuLawCodec(), ImaAdpcmCodec())}
+CODEC_IDS = {"linear16": 0, "mulaw": 1, "ima_adpcm": 2}  # wire ids used by binary audio frames
+
+
+def get_codec(name: Optional[str]):
+    """Codec by name (None means linear16); ValueError for unknown names."""
+    codec = CODECS.get(name or "linear16")
+    if codec is None:
+        raise ValueError(f"unknown audio codec: {name}")
+    return codec
+
+
+def negotiate(offered: Optional[Iterable[str]]) -> str:
+    """First codec in the server's AUDIO_CODECS order that the page offers; linear16 otherwise."""
+    offered = set(offered or ())
+    for name in AUDIO_CODECS:
+        if name in offered and name in CODECS:
+            return name
+    return "linear16"
@@ -0,0 +1,81 @@
+# common/audio_emitter.py
+import asyncio, logging, time
+from collections import deque
+from typing import Callable, List, Optional, Tuple
+
+from .config import AGENT_AUDIO_SAMPLE_RATE, AUDIO_PACKET_MS, AUDIO_BATCH_FRAMES
+
+logger = logging.getLogger(__name__)
+
+
+class AudioEmitter:
+    """Event-driven TTS emitter that runs on the agent event loop.
+
+    ``push`` is called for every PCM chunk from the agent; a single task wakes as
+    soon as a chunk is queued (no polling), coalesces whatever is already waiting
+    up to ``packet_ms`` of audio, and hands it to ``emit(payload, seq)``.
+    Coalescing never waits for more audio, so it adds no latency of its own.
+    With ``emit_batch``, up to ``batch_frames`` such packets that are already
+    queued are handed over together as ``emit_batch([(payload, seq), ...])``.
+    """
+
+    def __init__(self, emit: Callable[[bytes, int], None], packet_ms: float = AUDIO_PACKET_MS,
+                 sample_rate: int = AGENT_AUDIO_SAMPLE_RATE, sample_width: int = 2,
+                 emit_batch: Optional[Callable[[List[Tuple[bytes, int]]], None]] = None,
+                 batch_frames: int = AUDIO_BATCH_FRAMES):
+        self._emit = emit
+        self._emit_batch = emit_batch
+        self.batch_frames = max(1, batch_frames) if emit_batch else 1
+        self.packet_bytes = max(sample_width, int(sample_rate * sample_width * packet_ms / 1000))
+        self.seq = 0
+        self.latencies = deque(maxlen=4096)  # chunk push -> emit, seconds
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        """Start the emit task; must be called on the agent loop."""
+        self._queue = asyncio.Queue()
+        self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def push(self, data: bytes, on_emitted: Optional[Callable[[float], None]] = None):
+        """Queue a chunk; ``on_emitted(delay_seconds)`` is called once it has been emitted."""
+        self._queue.put_nowait((time.perf_counter(), data, on_emitted))
+
+    def _packet(self, stamp, data, cb, stamps, callbacks) -> bytes:
+        parts, size = [data], len(data)
+        stamps.append(stamp)
+        if cb:
+            callbacks.append((stamp, cb))
+        while size < self.packet_bytes and not self._queue.empty():
+            stamp, data, cb = self._queue.get_nowait()
+            stamps.append(stamp)
+            parts.append(data)
+            size += len(data)
+            if cb:
+                callbacks.append((stamp, cb))
+        return parts[0] if len(parts) == 1 else b"".join(parts)
+
+    async def _run(self):
+        while True:
+            stamps, callbacks = [], []
+            frames = [(self._packet(*await self._queue.get(), stamps, callbacks), self.seq)]
+            self.seq += 1
+            while len(frames) < self.batch_frames and not self._queue.empty():
+                frames.append((self._packet(*self._queue.get_nowait(), stamps, callbacks), self.seq))
+                self.seq += 1
+            try:
+                if self._emit_batch is not None:
+                    self._emit_batch(frames)
+                else:
+                    self._emit(*frames[0])
+            except Exception as e:
+                logger.error(f"audio emit error: {e}")
+            now = time.perf_counter()
+            self.latencies.extend(now - s for s in stamps)
+            for s, cb in callbacks:
+                cb(now - s)
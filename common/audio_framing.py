@@ -0,0 +1,48 @@
+# common/audio_framing.py
+import struct
+from typing import Iterable, List, Tuple
+
+from .audio_codec import CODECS, CODEC_IDS
+from .config import AUDIO_BINARY_FRAMING
+
+# per frame: seq (u32), flags (u16: low 4 bits = codec id), sample count (u16); then the encoded payload.
+# The payload length follows from codec and sample count, so frames are simply concatenated.
+FRAME_HEADER = struct.Struct("<IHH")
+MAX_FRAME_SAMPLES = 0xFFFF
+CODEC_MASK = 0x000F
+_CODEC_BY_ID = {i: name for name, i in CODEC_IDS.items()}
+
+
+def pack_frames(frames: Iterable[Tuple[int, int, bytes]], codec: str) -> bytes:
+    """Concatenate (seq, samples, encoded payload) frames of one codec into one packet."""
+    flags = CODEC_IDS[codec] & CODEC_MASK
+    parts = []
+    for seq, samples, payload in frames:
+        if samples > MAX_FRAME_SAMPLES:
+            raise ValueError(f"frame of {samples} samples exceeds {MAX_FRAME_SAMPLES}")
+        parts.append(FRAME_HEADER.pack(seq & 0xFFFFFFFF, flags, samples))
+        parts.append(payload)
+    return b"".join(parts)
+
+
+def unpack_frames(data: bytes) -> List[Tuple[int, str, int, bytes]]:
+    """Split a packet back into (seq, codec, samples, payload) frames."""
+    frames, offset = [], 0
+    view = memoryview(data)
+    while offset + FRAME_HEADER.size <= len(data):
+        seq, flags, samples = FRAME_HEADER.unpack_from(data, offset)
+        codec = _CODEC_BY_ID.get(flags & CODEC_MASK)
+        if codec is None:
+            raise ValueError(f"unknown codec id {flags & CODEC_MASK} in audio frame {seq}")
+        offset += FRAME_HEADER.size
+        size = CODECS[codec].encoded_size(samples)
+        if offset + size > len(data):
+            raise ValueError(f"truncated audio frame {seq}")
+        frames.append((seq, codec, samples, bytes(view[offset:offset + size])))
+        offset += size
+    return frames
+
+
+def negotiate_framing(requested) -> str:
+    """"binary" when the page asks for it and AUDIO_BINARY_FRAMING allows it, else "json"."""
+    return "binary" if AUDIO_BINARY_FRAMING and requested == "binary" else "json"
@@ -0,0 +1,109 @@
+# common/chunk_store.py
+import hashlib, json, os, re
+from typing import Callable, List, Sequence
+
+import numpy as np
+
+from .rag_index import _normalize_rows
+
+
+class ChunkEmbeddingStore:
+    """Content-addressed embeddings: sha256(model, chunk text) -> normalized float32 row.
+
+    Rows survive document edits, so a rebuild only embeds chunks whose text is new.
+    On disk it is ``<model>.chunks.npy`` (matrix) plus ``<model>.chunks.json`` (keys
+    in row order), rewritten atomically by ``save``; at most ``max_rows`` are kept,
+    rows of the current document first.
+    """
+
+    def __init__(self, directory: str, model: str, max_rows: int = 20000):
+        self.model = model
+        self.max_rows = max_rows
+        slug = re.sub(r"[^A-Za-z0-9_.-]", "_", model)
+        self.vec_file = os.path.join(directory, f"{slug}.chunks.npy")
+        self.key_file = os.path.join(directory, f"{slug}.chunks.json")
+        self._rows = {}  # key -> row in self._mat
+        self._mat = None
+        self._new = {}   # key -> row vector not yet saved
+        self.reused = 0
+        self.embedded = 0
+        self.calls = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.key_file, "r", encoding="utf-8") as f:
+                keys = json.load(f)["keys"]
+            mat = np.load(self.vec_file, mmap_mode="r")
+            if mat.dtype == np.float32 and mat.shape[0] == len(keys):
+                self._rows = {k: i for i, k in enumerate(keys)}
+                self._mat = mat
+        except Exception:
+            pass
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{text}".encode()).hexdigest()
+
+    def _get(self, key: str):
+        vec = self._new.get(key)
+        if vec is None and key in self._rows:
+            vec = self._mat[self._rows[key]]
+        return vec
+
+    def contains(self, text: str) -> bool:
+        return self._get(self.key(text)) is not None
+
+    def add(self, texts: Sequence[str], mat: np.ndarray) -> int:
+        """Record already-normalized rows; returns how many keys were new."""
+        added = 0
+        for text, vec in zip(texts, mat):
+            key = self.key(text)
+            if self._get(key) is None:
+                self._new[key] = np.asarray(vec, dtype=np.float32)
+                added += 1
+        return added
+
+    def embed_missing(self, texts: Sequence[str], embed: Callable[[List[str]], List[List[float]]],
+                      batch_size: int = 64) -> int:
+        """Embed the distinct texts that have no stored row; returns how many were embedded."""
+        keys = {}
+        for t in texts:
+            k = self.key(t)
+            if k not in keys and self._get(k) is None:
+                keys[k] = t
+        missing = list(keys.items())
+        for i in range(0, len(missing), batch_size):
+            batch = missing[i:i + batch_size]
+            vectors = _normalize_rows(np.asarray(embed([t for _, t in batch]), dtype=np.float32))
+            self.calls += 1
+            self.embedded += len(batch)
+            for (k, _), vec in zip(batch, vectors):
+                self._new[k] = vec
+        return len(missing)
+
+    def matrix(self, texts: Sequence[str]) -> np.ndarray:
+        """Stored rows for ``texts`` (all must be present), without touching the counters."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.ascontiguousarray(np.stack([self._get(self.key(t)) for t in texts]), dtype=np.float32)
+
+    def save(self, current: Sequence[str] = ()):
+        """Persist new rows; rows for ``current`` texts are kept first when trimming."""
+        if not self._new:
+            return
+        order = list(dict.fromkeys([self.key(t) for t in current] + list(self._new) + list(self._rows)))
+        order = [k for k in order if self._get(k) is not None][:self.max_rows]
+        mat = np.stack([self._get(k) for k in order]).astype(np.float32, copy=False)
+        with open(self.vec_file + ".tmp", "wb") as f:
+            np.save(f, mat)
+        with open(self.key_file + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"format": 1, "model": self.model, "keys": order}, f)
+        os.replace(self.vec_file + ".tmp", self.vec_file)
+        os.replace(self.key_file + ".tmp", self.key_file)
+        self._rows = {k: i for i, k in enumerate(order)}
+        self._mat = mat
+        self._new = {}
+
+    def stats(self) -> dict:
+        return {"rows": len(self._rows) + len(self._new), "reused": self.reused,
+                "embedded": self.embedded, "embedding_calls": self.calls}
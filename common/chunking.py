@@ -0,0 +1,83 @@
+# common/chunking.py
+import re
+from typing import Iterable, Iterator, Tuple
+
+BOUNDARIES = ("char", "sentence", "token")
+
+# a unit carries its own leading whitespace, so units are contiguous in the source text
+_UNITS = {
+    "sentence": re.compile(r"\s*\S.*?(?:[.!?]+(?=\s)|(?=\n)|$)", re.S),
+    "token": re.compile(r"\s*\S+"),
+}
+
+
+def stream_chunks(pieces: Iterable[str], size: int, overlap: int,
+                  boundary: str = "char") -> Iterator[Tuple[int, str]]:
+    """Yield (start offset, text) chunks of the concatenated ``pieces``.
+
+    Only the current window is buffered, so memory stays O(size + piece) however
+    long the stream is. ``boundary="char"`` reproduces fixed windows of ``size``
+    characters every ``size - overlap``; "sentence" and "token" pack whole units
+    up to ``size`` characters and carry trailing units worth at most ``overlap``
+    characters into the next chunk.
+    """
+    if boundary == "char":
+        return _char_chunks(pieces, size, overlap)
+    if boundary not in _UNITS:
+        raise ValueError(f"unknown chunk boundary: {boundary}")
+    return _unit_chunks(_units(pieces, _UNITS[boundary]), size, overlap)
+
+
+def _char_chunks(pieces, size, overlap):
+    step = max(1, size - overlap)
+    buf, buf_start, start, total = "", 0, 0, 0
+    for piece in pieces:
+        buf += piece
+        total += len(piece)
+        while start + size <= total:
+            yield start, buf[start - buf_start:start - buf_start + size]
+            start += step
+        if start > buf_start:
+            buf = buf[start - buf_start:]
+            buf_start = start
+    while start < total:
+        yield start, buf[start - buf_start:start - buf_start + size]
+        start += step
+
+
+def _units(pieces, pattern) -> Iterator[Tuple[int, str]]:
+    """(offset, unit) pairs; the last match of each buffer may be incomplete, so it is carried."""
+    carry, carry_start = "", 0
+    for piece in pieces:
+        buf = carry + piece
+        last = None
+        for m in pattern.finditer(buf):
+            if last is not None:
+                yield carry_start + last.start(), last.group()
+            last = m
+        if last is None:
+            carry = buf
+        else:
+            carry, carry_start = buf[last.start():], carry_start + last.start()
+    for m in pattern.finditer(carry):
+        yield carry_start + m.start(), m.group()
+
+
+def _unit_chunks(units, size, overlap):
+    window = []  # (offset, unit) of the chunk being filled
+    length = 0
+    for start, unit in units:
+        if len(unit) > size:  # a unit that cannot fit anywhere is split on characters
+            if window:
+                yield window[0][0], "".join(u for _, u in window)
+                window, length = [], 0
+            yield from ((start + i, t) for i, t in _char_chunks([unit], size, overlap))
+            continue
+        if window and length + len(unit) > size:
+            yield window[0][0], "".join(u for _, u in window)
+            while window and (length > overlap or length + len(unit) > size):
+                length -= len(window.pop(0)[1])
+        window.append((start, unit))
+        length += len(unit)
+    if window:
+        yield window[0][0], "".join(u for _, u in window)
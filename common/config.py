@@ -1,21 +1,105 @@
 # common/config.py
+import os
 
 # ---------------------------
 # RAG / Shubham Chat Bot
 # ---------------------------
-DOCS_PATH = "docs/shubham_profile.docx"  # your single DOCX
+DOCS_PATH = "docs/shubham_profile.docx"  # a single DOCX, or a directory of profile files
+DOCS_EXTENSIONS = (".docx", ".txt", ".md")  # file types picked up when DOCS_PATH is a directory
+INGEST_WORKERS = min(4, os.cpu_count() or 1)  # processes parsing/chunking a directory corpus
 
 # Chunking
 CHUNK_SIZE = 800
 CHUNK_OVERLAP = 120
+CHUNK_BOUNDARY = "char"  # "char" (fixed windows), "sentence" or "token" (whole units up to CHUNK_SIZE)
 
 # Embeddings (set OPENAI_API_KEY in env)
 USE_OPENAI_EMBEDDINGS = True
 OPENAI_EMBED_MODEL = "text-embedding-3-small"
 EMBED_BATCH_SIZE = 64
 RAG_CACHE_DIR = "rag_cache"
+# Prebuilt index (python -m common.rag_store build); servers load it at boot and refuse a stale one
+INDEX_ARTIFACT_DIR = "rag_index"
+INDEX_ARTIFACT_KEEP = 3  # previous builds kept next to the current one
+
+# Retrieval mode: "auto" (dense if embeddings are available, else sparse),
+# "dense", "sparse", or "hybrid" (dense + BM25 fused with reciprocal rank fusion)
+RETRIEVAL_MODE = "auto"
+HYBRID_SKIP_DENSE = False      # hybrid: answer from the BM25 leg alone (embedding API slow/over budget)
+HYBRID_DENSE_DEADLINE = 0.8    # hybrid: seconds to wait for the query embedding before going sparse-only
+HYBRID_CANDIDATES = 50         # candidates taken from each leg before fusion
+RRF_K = 60
+
+# Sparse (BM25) fallback used when OpenAI embeddings are unavailable
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Retrieval timeouts (seconds)
+EMBED_TIMEOUT = 3.0       # one query-embedding request
+RETRIEVE_TIMEOUT = 5.0    # whole retrieve_context call, including a cold index build
+
+# Client-side function calls (seconds); each call runs as its own task under its timeout
+FUNCTION_TIMEOUT = 8.0
+FUNCTION_TIMEOUTS = {"retrieve_context": RETRIEVE_TIMEOUT + 1.0, "agent_filler": 2.0, "end_call": 2.0}
+
+# Sessions (one VoiceAgent per Socket.IO connection)
+MAX_CONCURRENT_SESSIONS = 20
+
+# Pre-warmed agent connections (per voice model). Each idle connection is a live
+# agent session upstream, so keep the pool small; 0 disables pre-warming.
+AGENT_POOL_SIZE = 1
+AGENT_POOL_IDLE_TTL = 120.0         # seconds before an idle connection is recycled
+AGENT_POOL_HEALTH_INTERVAL = 5.0    # seconds between KeepAlive/health checks
+AGENT_POOL_MAX_BACKLOG = 2000       # messages buffered from an idle connection (greeting etc.)
+AGENT_POOL_MAX_BACKOFF = 300.0      # cap of the exponential retry delay after failed warm connects
 
 # Audio (constants used by the agent)
 USER_AUDIO_SAMPLE_RATE = 48000
+USER_AUDIO_CHANNELS = 1
+UPSTREAM_AUDIO_SAMPLE_RATE = 16000  # mic audio is resampled to this before it goes to the agent
+RESAMPLER_TAPS = 48                 # FIR taps per polyphase branch
 USER_AUDIO_SECS_PER_CHUNK = 0.05
 AGENT_AUDIO_SAMPLE_RATE = 16000
+AUDIO_PACKET_MS = 100  # TTS chunks already queued are coalesced into packets of up to this much audio
+# Browser audio codecs, in server preference order; each session uses the first one its page offers.
+# "ima_adpcm" is opt-in: ~15 ms of agent-loop CPU per second of TTS per session, vs <1 ms for mulaw.
+AUDIO_CODECS = ("mulaw", "linear16")
+ADPCM_BLOCK_SAMPLES = 65   # odd: first sample in the block header, then (n - 1) / 2 bytes of nibbles
+# Binary audio framing: "audio_frames" events of [seq u32, flags u16, samples u16] + payload, several per event
+AUDIO_BINARY_FRAMING = True  # offered to pages that ask for it; others keep the JSON "audio_output" events
+AUDIO_BATCH_FRAMES = 4       # frames already queued that may share one event
+
+# Query-embedding cache (in-memory LRU + optional disk tier under RAG_CACHE_DIR)
+QUERY_CACHE_SIZE = 1024
+QUERY_CACHE_TTL = 7 * 24 * 3600  # seconds
+QUERY_CACHE_DISK = True
+QUERY_CACHE_DISK_MAX = 10000     # files in rag_cache/queries/; the oldest are evicted past this
+
+# Semantic result cache: near-duplicate questions (by query-embedding cosine) reuse earlier passages
+RESULT_CACHE_SIZE = 256          # 0 disables
+RESULT_CACHE_THRESHOLD = 0.95    # minimum cosine between query embeddings
+RESULT_CACHE_AUDIT_RATE = 0.05   # share of hits re-scored to measure cached-answer quality
+
+# Speculative retrieval: start retrieve_context for each user transcript before the LLM asks
+PREFETCH_ENABLED = True
+PREFETCH_K = 5             # results prefetched; function calls asking for more fall through
+PREFETCH_MIN_WORDS = 3     # skip "yes", "thanks", ...
+PREFETCH_MIN_OVERLAP = 0.6 # share of the function query's words that must appear in the utterance
+PREFETCH_TTL = 30.0        # seconds a prefetched result stays usable
+PREFETCH_MAX_ENTRIES = 4   # recent utterances kept per session
+
+# Browser log shipping (common.log_formatter.BrowserLogHandler)
+LOG_SHIP_ENABLED = False     # server log lines also go out as "log_messages" (never to ordinary visitors)
+LOG_SHIP_ROOM = "admin-logs" # only sockets that sent "subscribe_logs" with the LOG_SHIP_TOKEN env value
+LOG_SHIP_QUEUE_SIZE = 2000   # records buffered for the worker; more are dropped
+LOG_SHIP_BATCH_SIZE = 50     # lines per "log_messages" emit
+LOG_SHIP_INTERVAL = 0.25     # seconds the worker waits to fill a batch
+LOG_SHIP_RATE = 100.0        # lines per second sustained; bursts up to LOG_SHIP_BURST
+LOG_SHIP_BURST = 200
+
+# /tts-models: Deepgram model list cached in memory, served stale while it refreshes
+TTS_MODELS_URL = "https://api.deepgram.com/v1/models"
+TTS_MODELS_TTL = 3600.0             # seconds before a background refresh is started
+TTS_MODELS_MAX_STALE = 7 * 24 * 3600.0  # older than this, a request waits for a fresh list
+TTS_MODELS_TIMEOUT = (3.0, 5.0)     # (connect, read) seconds per upstream request
+TTS_MODELS_RETRY = 30.0             # seconds before retrying after an upstream failure
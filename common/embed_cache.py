@@ -0,0 +1,249 @@
+# common/embed_cache.py
+import os, re, time, hashlib, asyncio, threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Optional, Sequence
+import numpy as np
+
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    return _SPACE.sub(" ", text).strip().lower()
+
+
+class QueryEmbeddingCache:
+    """LRU + TTL cache of query embeddings with an optional on-disk tier.
+
+    Concurrent callers asking for the same key share one upstream request:
+    the first caller computes, the rest wait on its Future. The disk tier holds
+    at most ``disk_max_entries`` files; past that the oldest are evicted.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 86400.0, disk_dir: Optional[str] = None,
+                 disk_max_entries: int = 10000):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.disk_max_entries = disk_max_entries
+        self._disk_count: Optional[int] = None  # counted on first write
+        self._disk_lock = threading.Lock()
+        self.disk_evictions = 0
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, vector)
+        self._inflight = {}  # key -> Future
+        self._tasks = set()  # strong refs to running async fills
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.shared = 0
+        self.misses = 0
+        self.miss_seconds = 0.0
+
+    @staticmethod
+    def key(text: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\0{normalize_query(text)}".encode()).hexdigest()
+
+    # ---- tiers ----
+    def _mem_get(self, key: str) -> Optional[np.ndarray]:
+        entry = self._mem.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._mem[key]
+            return None
+        self._mem.move_to_end(key)
+        return entry[1]
+
+    def _mem_put(self, key: str, vec: np.ndarray):
+        self._mem[key] = (time.monotonic() + self.ttl, vec)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_size:
+            self._mem.popitem(last=False)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.npy")
+
+    def _disk_get(self, key: str) -> Optional[np.ndarray]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            return np.load(path)
+        except (OSError, ValueError):
+            return None
+
+    def _disk_put(self, key: str, vec: np.ndarray):
+        if not self.disk_dir:
+            return
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            tmp = self._disk_path(key) + f".{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, vec)
+            os.replace(tmp, self._disk_path(key))
+        except OSError:
+            return
+        with self._disk_lock:
+            if self._disk_count is None:
+                self._disk_count = sum(1 for e in os.scandir(self.disk_dir) if e.name.endswith(".npy"))
+            else:
+                self._disk_count += 1  # overwrites of a key are rare; the next eviction recounts
+            if self._disk_count > self.disk_max_entries:
+                self._disk_evict()
+
+    def _disk_evict(self):
+        """Drop expired files, then the oldest, down to 90% of the cap (caller holds _disk_lock)."""
+        try:
+            entries = sorted((e.stat().st_mtime, e.path) for e in os.scandir(self.disk_dir) if e.name.endswith(".npy"))
+        except OSError:
+            return
+        expired = time.time() - self.ttl
+        keep = int(self.disk_max_entries * 0.9)
+        removed = 0
+        for i, (mtime, path) in enumerate(entries):
+            if mtime >= expired and len(entries) - i <= keep:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        self.disk_evictions += removed
+        self._disk_count = len(entries) - removed
+
+    # ---- public API ----
+    def get(self, text: str, model: str) -> Optional[np.ndarray]:
+        key = self.key(text, model)
+        with self._lock:
+            vec = self._mem_get(key)
+            if vec is not None:
+                self.hits += 1
+                return vec
+        vec = self._disk_get(key)
+        if vec is not None:
+            with self._lock:
+                self.disk_hits += 1
+                self._mem_put(key, vec)
+        return vec
+
+    def put(self, text: str, model: str, vec: Sequence[float]) -> np.ndarray:
+        key = self.key(text, model)
+        arr = np.asarray(vec, dtype=np.float32)
+        with self._lock:
+            self._mem_put(key, arr)
+        self._disk_put(key, arr)
+        return arr
+
+    def get_or_compute(self, text: str, model: str, compute: Callable[[str], Sequence[float]],
+                       timeout: Optional[float] = None) -> np.ndarray:
+        """Return the cached embedding, or compute it once for all concurrent callers.
+
+        Callers waiting on another caller's request give up after ``timeout`` seconds
+        (concurrent.futures.TimeoutError), so one hung request does not block them all.
+        """
+        vec = self.get(text, model)
+        if vec is not None:
+            return vec
+        key = self.key(text, model)
+        with self._lock:
+            vec = self._mem_get(key)  # another caller may have finished meanwhile
+            if vec is not None:
+                self.hits += 1
+                return vec
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._inflight[key] = Future()
+            else:
+                self.shared += 1
+        if not owner:
+            return fut.result(timeout)
+        t0 = time.perf_counter()
+        try:
+            arr = self.put(text, model, compute(text))
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(arr)
+            return arr
+        finally:
+            with self._lock:
+                self.misses += 1
+                self.miss_seconds += time.perf_counter() - t0
+                self._inflight.pop(key, None)
+
+    async def aget_or_compute(self, text: str, model: str,
+                              acompute: Callable[[str], Awaitable[Sequence[float]]]) -> np.ndarray:
+        """Async twin of get_or_compute; in-flight requests are shared with sync callers too.
+
+        The upstream request runs as its own task, so a caller that times out or is
+        cancelled does not abort it for the other waiters (and the result still lands
+        in the cache).
+        """
+        key = self.key(text, model)
+        with self._lock:
+            vec = self._mem_get(key)
+            if vec is not None:
+                self.hits += 1
+                return vec
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._inflight[key] = Future()
+            else:
+                self.shared += 1
+        if owner:
+            vec = self._disk_get(key)
+            if vec is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._mem_put(key, vec)
+                    self._inflight.pop(key, None)
+                fut.set_result(vec)
+                return vec
+            task = asyncio.ensure_future(self._fill(key, text, model, acompute, fut))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        # shield: a waiter's timeout must not cancel the shared Future under the others
+        return await asyncio.shield(asyncio.wrap_future(fut))
+
+    async def _fill(self, key, text, model, acompute, fut: Future):
+        t0 = time.perf_counter()
+        try:
+            arr = self.put(text, model, await acompute(text))
+        except asyncio.CancelledError:
+            fut.cancel()  # owning loop is shutting down
+            raise
+        except Exception as e:
+            if not fut.done():
+                fut.set_exception(e)
+        else:
+            if not fut.done():
+                fut.set_result(arr)
+        finally:
+            with self._lock:
+                self.misses += 1
+                self.miss_seconds += time.perf_counter() - t0
+                self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            served = self.hits + self.disk_hits + self.shared
+            total = served + self.misses
+            avg_miss = self.miss_seconds / self.misses if self.misses else 0.0
+            return {
+                "size": len(self._mem),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "shared_inflight": self.shared,
+                "misses": self.misses,
+                "disk_entries": self._disk_count or 0,
+                "disk_evictions": self.disk_evictions,
+                "hit_rate": round(served / total, 4) if total else 0.0,
+                "avg_miss_ms": round(avg_miss * 1000, 2),
+                "network_seconds_saved": round(served * avg_miss, 3),
+            }
@@ -0,0 +1,94 @@
+# common/function_dispatcher.py
+import asyncio, json, logging, time
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Optional
+
+from .agent_functions import FUNCTION_MAP
+from .config import FUNCTION_TIMEOUT, FUNCTION_TIMEOUTS
+from .metrics import FUNCTION_EXECUTION
+
+logger = logging.getLogger(__name__)
+
+# functions that take the agent websocket and return function_response/inject_message
+WS_FUNCTIONS = ("agent_filler", "end_call")
+# functions that can be served from the session's RetrievalPrefetcher
+PREFETCH_FUNCTIONS = ("retrieve_context",)
+
+
+class FunctionDispatcher:
+    """Runs a FunctionCallRequest's functions as tasks so the receiver never waits on them.
+
+    Every function in a request runs in parallel under its own timeout, and each
+    FunctionCallResponse is sent as soon as that function finishes. ``on_end_call``
+    is awaited after end_call's response and farewell have been sent; ``prefetcher``
+    is handed to retrieval functions so they can reuse speculative results.
+    """
+
+    def __init__(self, ws, on_end_call: Optional[Callable[[], Awaitable]] = None, function_map=FUNCTION_MAP,
+                 prefetcher=None):
+        self.ws = ws
+        self.on_end_call = on_end_call
+        self.prefetcher = prefetcher
+        self.function_map = function_map
+        self.timings = defaultdict(lambda: deque(maxlen=1024))  # name -> execution seconds
+        self._tasks = set()
+
+    def dispatch(self, msg: dict):
+        for fn in msg.get("functions", []):
+            if not fn.get("client_side", True):
+                continue  # executed by the agent itself
+            task = asyncio.ensure_future(self._run(fn))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send_response(self, call_id, name, content):
+        resp = {"type": "FunctionCallResponse", "id": call_id, "name": name, "content": json.dumps(content)}
+        await self.ws.send(json.dumps(resp))
+
+    async def _run(self, fn: dict):
+        name = fn.get("name")
+        call_id = fn.get("id")
+        t0 = time.perf_counter()
+        try:
+            impl = self.function_map.get(name)
+            if not impl:
+                raise ValueError(f"Unknown function: {name}")
+            params = json.loads(fn.get("arguments") or "{}")
+            timeout = FUNCTION_TIMEOUTS.get(name, FUNCTION_TIMEOUT)
+            if name in WS_FUNCTIONS:
+                result = await asyncio.wait_for(impl(self.ws, params), timeout)
+            elif name in PREFETCH_FUNCTIONS and self.prefetcher is not None:
+                result = await asyncio.wait_for(impl(params, prefetcher=self.prefetcher), timeout)
+            else:
+                result = await asyncio.wait_for(impl(params), timeout)
+        except asyncio.TimeoutError:
+            result, error = None, f"{name} timed out"
+        except Exception as e:
+            result, error = None, str(e)
+        else:
+            error = None
+        elapsed = time.perf_counter() - t0
+        self.timings[name].append(elapsed)
+        FUNCTION_EXECUTION.observe(elapsed, function=name)
+        logger.info(f"function execution latency: {name} {elapsed * 1000:.1f} ms")
+        try:
+            if error is not None:
+                await self._send_response(call_id, name, {"error": error})
+            elif name in WS_FUNCTIONS:
+                # send response first, then inject message / close if needed
+                await self._send_response(call_id, name, result["function_response"])
+                await self.ws.send(json.dumps(result["inject_message"]))
+                if name == "end_call" and self.on_end_call:
+                    await self.on_end_call()
+            else:
+                await self._send_response(call_id, name, result)
+        except Exception as e:
+            logger.error(f"function response error ({name}): {e}")
+
+    def stats(self) -> dict:
+        return {name: {"count": len(v), "avg_ms": round(1000 * sum(v) / len(v), 2), "max_ms": round(1000 * max(v), 2)}
+                for name, v in self.timings.items() if v}
+
+    def close(self):
+        for task in list(self._tasks):
+            task.cancel()
@@ -1,17 +1,44 @@
 import logging
-import json
+import queue
+import re
+import threading
+import time
 from datetime import datetime
 from flask_socketio import SocketIO
 
+from .config import (
+    LOG_SHIP_QUEUE_SIZE,
+    LOG_SHIP_BATCH_SIZE,
+    LOG_SHIP_INTERVAL,
+    LOG_SHIP_RATE,
+    LOG_SHIP_BURST,
+    LOG_SHIP_ROOM,
+)
+
+FORMAT_STR = "%(asctime)s.%(msecs)03d %(levelname)s: %(message)s"
+
+# Cheap type detection: pull "type"/"role" out of a logged JSON body with a regex
+# instead of lowercasing and json-parsing every message
+_TYPE_RE = re.compile(r'"type"\s*:\s*"(\w+)"', re.IGNORECASE)
+_ROLE_RE = re.compile(r'"role"\s*:\s*"(\w+)"', re.IGNORECASE)
+_FUNCTION_RE = re.compile(r"function response|parameters|function call", re.IGNORECASE)
+_INJECT_RE = re.compile(r"injectagentmessage", re.IGNORECASE)
+_LATENCY_RE = re.compile(
+    r"decision latency|function execution latency|first audio latency", re.IGNORECASE
+)
+
+USER_TYPES = ("userstartedspeaking", "endofthought")
+AGENT_TYPES = ("agentstartedspeaking", "agentaudiodone")
+FUNCTION_TYPES = ("functioncalling", "functioncallrequest")
+
+_SHIPPERS = []  # live BrowserLogHandlers, read by log_ship_stats()
+
 
 class CustomFormatter(
     logging.Formatter,
 ):
     """Custom formatter to color-code log messages based on their content."""
 
-    def __init__(self, socketio: SocketIO = None):
-        self.socketio = socketio
-
     # ANSI escape codes for colors - using accessible palette
     COLORS = {
         "RESET": "\033[0m",
@@ -22,74 +49,186 @@ class CustomFormatter(
         "YELLOW": "\033[38;5;186m",  # Latency info
     }
 
+    def __init__(self):
+        super().__init__(FORMAT_STR, datefmt="%H:%M:%S")
+        # one precompiled formatter per color instead of a new one per record
+        self.formatters = {
+            name: logging.Formatter(code + FORMAT_STR + self.COLORS["RESET"], datefmt="%H:%M:%S")
+            for name, code in self.COLORS.items()
+            if name != "RESET"
+        }
+
+    @staticmethod
+    def color_for(msg: str) -> str:
+        """Color name for a log message."""
+        if "server:" in msg.lower() and "{" in msg:
+            match = _TYPE_RE.search(msg)
+            msg_type = match.group(1).lower() if match else ""
+            if msg_type == "conversationtext":
+                role = _ROLE_RE.search(msg)
+                role = role.group(1).lower() if role else ""
+                if role == "user":
+                    return "BLUE"
+                if role == "assistant":
+                    return "GREEN"
+            elif msg_type in USER_TYPES:
+                return "BLUE"
+            elif msg_type in AGENT_TYPES:
+                return "GREEN"
+            elif msg_type in FUNCTION_TYPES:
+                return "VIOLET"
+            return "WHITE"
+        if _FUNCTION_RE.search(msg):
+            return "VIOLET"
+        if _INJECT_RE.search(msg):
+            return "GREEN"
+        if _LATENCY_RE.search(msg):
+            return "YELLOW"
+        return "WHITE"
+
     def format(self, record):
-        # Default format string
-        format_str = "%(asctime)s.%(msecs)03d %(levelname)s: %(message)s"
+        return self.formatters[self.color_for(str(record.msg))].format(record)
+
+
+class BrowserLogHandler(logging.Handler):
+    """Ships log lines to the browser in batches from a background worker.
 
-        # Default to white
-        color = self.COLORS["WHITE"]
+    ``emit`` only rate-limits and enqueues the record (no formatting, no socket
+    I/O), so logging from the audio path stays cheap. The worker formats queued
+    records and sends up to ``batch_size`` lines per "log_messages" event. Records
+    over the token-bucket rate or arriving while the queue is full are dropped
+    and counted; the next batch carries the drop count.
 
-        msg = str(record.msg).lower()
+    Lines go only to ``room`` (server logs carry every visitor's transcripts),
+    never broadcast. The event replaces the per-line "log_message" event that
+    CustomFormatter used to send: it carries
+    ``{"messages": [{"message", "timestamp"}, ...], "dropped": n}``.
+    """
 
-        # Check for JSON content
-        if "server:" in msg and "{" in msg:
+    def __init__(
+        self,
+        socketio: SocketIO,
+        queue_size: int = LOG_SHIP_QUEUE_SIZE,
+        batch_size: int = LOG_SHIP_BATCH_SIZE,
+        interval: float = LOG_SHIP_INTERVAL,
+        rate: float = LOG_SHIP_RATE,
+        burst: int = LOG_SHIP_BURST,
+        room: str = LOG_SHIP_ROOM,
+    ):
+        super().__init__()
+        self.socketio = socketio
+        self.room = room
+        self.batch_size = batch_size
+        self.interval = interval
+        self.rate = rate
+        self.burst = burst
+        self.shipped = 0
+        self.dropped_rate = 0
+        self.dropped_full = 0
+        self._unreported = 0
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        self._bucket_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._closed = False
+        self.setFormatter(CustomFormatter())
+        self._worker = socketio.start_background_task(self._run)
+        _SHIPPERS.append(self)
+
+    def _take_token(self) -> bool:
+        with self._bucket_lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            if self._tokens < 1.0:
+                self.dropped_rate += 1
+                self._unreported += 1
+                return False
+            self._tokens -= 1.0
+            return True
+
+    def emit(self, record):
+        """Queue the record for the worker; never formats and never blocks."""
+        if self._closed or not self._take_token():
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._bucket_lock:
+                self.dropped_full += 1
+                self._unreported += 1
+
+    def _line(self, record: logging.LogRecord) -> dict:
+        return {
+            "message": self.format(record),
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(),
+        }
+
+    def _ship(self, batch):
+        lines = []
+        for item in batch:
             try:
-                # Extract the JSON part
-                json_str = msg[msg.find("{") : msg.rfind("}") + 1]
-                data = json.loads(json_str)
-
-                # User/STT related messages
-                if data.get("type") in ["userstartedspeaking", "endofthought"] or (
-                    data.get("type") == "conversationtext"
-                    and data.get("role") == "user"
-                ):
-                    color = self.COLORS["BLUE"]
-
-                # Agent speaking/TTS related messages
-                elif data.get("type") in ["agentstartedspeaking", "agentaudiodone"] or (
-                    data.get("type") == "conversationtext"
-                    and data.get("role") == "assistant"
-                ):
-                    color = self.COLORS["GREEN"]
-
-                # Agent thinking/function calling
-                elif data.get("type") in ["functioncalling", "functioncallrequest"]:
-                    color = self.COLORS["VIOLET"]
-
-            except (json.JSONDecodeError, KeyError):
-                pass
-
-        # Non-JSON messages
-        else:
-            if any(
-                phrase in msg
-                for phrase in ["function response", "parameters", "function call"]
-            ):
-                color = self.COLORS["VIOLET"]
-            elif "injectagentmessage" in msg:
-                color = self.COLORS["GREEN"]
-            elif any(
-                phrase in msg
-                for phrase in ["decision latency", "function execution latency"]
-            ):
-                color = self.COLORS["YELLOW"]
-
-        # Apply the color to the format string
-        formatter = logging.Formatter(
-            color + format_str + self.COLORS["RESET"], datefmt="%H:%M:%S"
-        )
-        formatted_message = formatter.format(record)
-        # Emit the log message to the client with timestamp
-        if self.socketio:
+                lines.append(self._line(item))
+            except Exception:
+                continue
+        with self._bucket_lock:
+            dropped, self._unreported = self._unreported, 0
+        try:
+            self.socketio.emit("log_messages", {"messages": lines, "dropped": dropped}, to=self.room)
+            self.shipped += len(lines)
+        except Exception as e:
+            print(f"Error emitting log messages: {e}")
+
+    def _run(self):
+        while True:
             try:
-                self.socketio.emit(
-                    "log_message",
-                    {
-                        "message": formatted_message,
-                        "timestamp": datetime.now().isoformat(),
-                    },
-                )
-            except Exception as e:
-                print(f"Error emitting log message: {e}")
-
-        return formatted_message
+                item = self._queue.get(timeout=self.interval)
+            except queue.Empty:
+                if self._closed:
+                    return
+                continue
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._ship(batch)
+                    return
+                batch.append(item)
+            self._ship(batch)
+
+    def stats(self) -> dict:
+        return {
+            "shipped": self.shipped,
+            "queued": self._queue.qsize(),
+            "dropped_rate": self.dropped_rate,
+            "dropped_full": self.dropped_full,
+        }
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            if self in _SHIPPERS:
+                _SHIPPERS.remove(self)
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                pass  # the worker exits on its next empty poll
+        super().close()
+
+
+def log_ship_stats() -> dict:
+    """Counters of every live BrowserLogHandler, summed; empty when none is attached."""
+    totals = {}
+    for handler in list(_SHIPPERS):
+        for key, value in handler.stats().items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
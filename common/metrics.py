@@ -0,0 +1,193 @@
+# common/metrics.py
+import importlib, logging, threading, time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# seconds; voice turns live between tens of milliseconds and a few seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0)
+
+REGISTRY: List = []  # every Histogram/Gauge, in registration order
+
+
+def _labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    """Cumulative-bucket histogram rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for key, s in sorted(series.items()):
+            bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, s[:len(self.buckets)] + [s[-1]]):
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {s[-2]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {s[-1]}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time (``kind="counter"`` for running totals).
+
+    A callback that raises or returns None leaves the series out of the scrape.
+    """
+
+    def __init__(self, name: str, help_text: str, fn: Callable[[], float], kind: str = "gauge"):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+        self.kind = kind
+        REGISTRY.append(self)
+
+    def render(self) -> List[str]:
+        try:
+            value = float(self.fn())
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", f"{self.name} {value}"]
+
+
+def stat(module: str, fn: str, key: str) -> Callable[[], Optional[float]]:
+    """Scrape-time reader of one field of a ``stats()`` helper.
+
+    The module is imported on first scrape, so registering does not pull the RAG
+    stack into processes that never serve /metrics.
+    """
+    def read():
+        return getattr(importlib.import_module(module), fn)().get(key)
+    return read
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+TURN_DECISION = Histogram(
+    "voice_turn_decision_seconds", "End of user speech (final user transcript) to the agent's FunctionCallRequest.")
+FUNCTION_EXECUTION = Histogram(
+    "voice_function_execution_seconds", "Client-side function execution time.", labelnames=("function",))
+TURN_FIRST_AUDIO = Histogram(
+    "voice_turn_first_audio_seconds", "End of user speech to the first TTS audio byte from the agent.")
+AUDIO_EMIT = Histogram(
+    "voice_audio_emit_seconds", "First TTS audio byte of a turn received from the agent to emitted to the browser.")
+
+# query-embedding cache (common.rag_store.query_cache_stats)
+for _key, _kind, _help in (
+        ("hits", "counter", "Query embeddings served from memory."),
+        ("disk_hits", "counter", "Query embeddings served from the disk tier."),
+        ("shared_inflight", "counter", "Query embeddings shared with a concurrent in-flight request."),
+        ("misses", "counter", "Query embeddings requested from the API."),
+        ("hit_rate", "gauge", "Share of query embeddings not requested from the API."),
+        ("network_seconds_saved", "counter", "Estimated API time saved by the cache."),
+        ("disk_entries", "gauge", "Files in the disk tier."),
+        ("disk_evictions", "counter", "Disk-tier files evicted by the size cap.")):
+    Gauge(f"rag_query_cache_{_key}" + ("_total" if _kind == "counter" else ""), _help,
+          stat("common.rag_store", "query_cache_stats", _key), kind=_kind)
+
+# semantic result cache (common.rag_store.result_cache_stats); absent until the store is built
+for _key, _kind, _help in (
+        ("hits", "counter", "Retrievals answered with the passages of a near-duplicate query."),
+        ("misses", "counter", "Retrievals with no near-duplicate cached query."),
+        ("evictions", "counter", "Cached results replaced by LRU."),
+        ("size", "gauge", "Cached query results."),
+        ("hit_rate", "gauge", "Share of retrievals answered from the cache."),
+        ("avg_hit_similarity", "gauge", "Mean cosine between a query and the cached query that answered it."),
+        ("audits", "counter", "Cache hits re-scored against the index."),
+        ("audit_overlap", "gauge", "Mean share of a fresh retrieval's passages that the audited cached answer also had."),
+        ("audit_exact_rate", "gauge", "Share of audited hits whose cached passages match a fresh retrieval exactly.")):
+    Gauge(f"rag_result_cache_{_key}" + ("_total" if _kind == "counter" else ""), _help,
+          stat("common.rag_store", "result_cache_stats", _key), kind=_kind)
+
+# retrieval prefetch (common.prefetch.prefetch_stats)
+for _key, _kind, _help in (
+        ("prefetches", "counter", "Retrievals started from a user transcript."),
+        ("hits", "counter", "retrieve_context calls answered by a finished prefetch."),
+        ("pending_hits", "counter", "retrieve_context calls that joined a prefetch still running."),
+        ("misses", "counter", "retrieve_context calls with no usable prefetch."),
+        ("hit_rate", "gauge", "Share of retrieve_context calls served by a prefetch."),
+        ("latency_saved_seconds", "counter", "Retrieval time saved by prefetching.")):
+    Gauge(f"rag_prefetch_{_key}" + ("_total" if _kind == "counter" else ""), _help,
+          stat("common.prefetch", "prefetch_stats", _key), kind=_kind)
+
+# browser log shipping (common.log_formatter.log_ship_stats); absent unless LOG_SHIP_ENABLED
+for _key, _kind, _help in (
+        ("shipped", "counter", "Log lines sent to the log room."),
+        ("queued", "gauge", "Log records waiting for the shipping worker."),
+        ("dropped_rate", "counter", "Log records dropped by the rate limit."),
+        ("dropped_full", "counter", "Log records dropped because the queue was full.")):
+    Gauge(f"voice_log_ship_{_key}" + ("_total" if _kind == "counter" else ""), _help,
+          stat("common.log_formatter", "log_ship_stats", _key), kind=_kind)
+
+
+class TurnTracer:
+    """Per-session clock for one conversation turn at a time.
+
+    The agent sends no end-of-speech event, so the final user ConversationText
+    (which arrives once the utterance is complete) marks the end of user speech.
+    """
+
+    def __init__(self, sid: str = ""):
+        self.sid = sid
+        self.speech_end: Optional[float] = None
+        self.decided = False
+        self.audio_started = False
+
+    def user_started_speaking(self):
+        self.speech_end = None
+
+    def user_text(self):
+        self.speech_end = time.perf_counter()
+        self.decided = False
+        self.audio_started = False
+
+    def function_call(self):
+        if self.speech_end is None or self.decided:
+            return
+        self.decided = True
+        elapsed = time.perf_counter() - self.speech_end
+        TURN_DECISION.observe(elapsed)
+        logger.info(f"decision latency: {elapsed * 1000:.1f} ms")
+
+    def audio(self) -> bool:
+        """Record the turn's first TTS byte; True when this chunk is it."""
+        if self.speech_end is None or self.audio_started:
+            return False
+        self.audio_started = True
+        elapsed = time.perf_counter() - self.speech_end
+        TURN_FIRST_AUDIO.observe(elapsed)
+        logger.info(f"first audio latency: {elapsed * 1000:.1f} ms")
+        return True
+
+    @staticmethod
+    def emitted(delay: float):
+        AUDIO_EMIT.observe(delay)
@@ -0,0 +1,122 @@
+# common/prefetch.py
+import asyncio, logging, re, time
+from collections import OrderedDict
+
+from .config import PREFETCH_K, PREFETCH_MIN_WORDS, PREFETCH_MIN_OVERLAP, PREFETCH_TTL, PREFETCH_MAX_ENTRIES
+from .embed_cache import normalize_query
+from .rag_store import aget_store
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+# process-wide counters, summed over every session's prefetcher
+_totals = {"prefetches": 0, "hits": 0, "pending_hits": 0, "misses": 0, "saved_seconds": 0.0}
+
+
+def _words(text: str) -> set:
+    return set(_WORD.findall(normalize_query(text)))
+
+
+class _Entry:
+    __slots__ = ("words", "task", "started", "finished")
+
+    def __init__(self, words, task):
+        self.words = words
+        self.task = task
+        self.started = time.perf_counter()
+        self.finished = None
+
+
+class RetrievalPrefetcher:
+    """Starts retrieval for a user's utterance as soon as its transcript arrives.
+
+    The agent's ``retrieve_context`` call comes one LLM round trip later; ``take``
+    hands it the prefetched hits when the function's query matches a recent
+    utterance (same words, or at least ``min_overlap`` of the query's words).
+    A prefetch still in flight is awaited rather than restarted.
+    """
+
+    def __init__(self, k: int = PREFETCH_K, min_words: int = PREFETCH_MIN_WORDS,
+                 min_overlap: float = PREFETCH_MIN_OVERLAP, ttl: float = PREFETCH_TTL,
+                 max_entries: int = PREFETCH_MAX_ENTRIES):
+        self.k = k
+        self.min_words = min_words
+        self.min_overlap = min_overlap
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # normalized utterance -> _Entry
+
+    def prefetch(self, text: str):
+        """Schedule retrieval for a user transcript; must be called on the agent loop."""
+        key = normalize_query(text or "")
+        words = _words(key)
+        if len(words) < self.min_words or key in self._entries:
+            return
+        entry = _Entry(words, asyncio.ensure_future(self._retrieve(key)))
+        entry.task.add_done_callback(lambda _t, e=entry: setattr(e, "finished", time.perf_counter()))
+        self._entries[key] = entry
+        _totals["prefetches"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)[1].task.cancel()
+
+    async def _retrieve(self, query: str):
+        store = await aget_store()
+        return await store.aretrieve(query, k=self.k)
+
+    def _match(self, query: str):
+        now = time.perf_counter()
+        for key in [k for k, e in self._entries.items() if now - e.started > self.ttl]:
+            self._entries.pop(key).task.cancel()
+        key = normalize_query(query)
+        if key in self._entries:
+            return self._entries[key]
+        words = _words(key)
+        if not words:
+            return None
+        best, best_overlap = None, 0.0
+        for entry in reversed(self._entries.values()):  # newest utterance wins ties
+            overlap = len(words & entry.words) / len(words)
+            if overlap > best_overlap:
+                best, best_overlap = entry, overlap
+        return best if best_overlap >= self.min_overlap else None
+
+    async def take(self, query: str, k: int):
+        """Prefetched hits for query (top k), or None on a miss."""
+        entry = self._match(query) if k <= self.k else None
+        if entry is None or entry.task.cancelled():
+            _totals["misses"] += 1
+            return None
+        asked = time.perf_counter()
+        done = entry.task.done()
+        try:
+            hits = await asyncio.shield(entry.task)
+        except asyncio.CancelledError:
+            if not entry.task.cancelled():
+                raise  # the caller itself was cancelled
+            _totals["misses"] += 1  # evicted while we waited
+            return None
+        except Exception as e:
+            logger.warning(f"prefetch failed, retrieving again: {e}")
+            _totals["misses"] += 1
+            return None
+        # a finished prefetch saved its whole duration; a pending one saved the part already run
+        _totals["saved_seconds"] += ((entry.finished or asked) - entry.started) if done else (asked - entry.started)
+        _totals["hits" if done else "pending_hits"] += 1
+        return hits[:k]
+
+    def close(self):
+        for entry in self._entries.values():
+            entry.task.cancel()
+        self._entries.clear()
+
+
+def prefetch_stats() -> dict:
+    lookups = _totals["hits"] + _totals["pending_hits"] + _totals["misses"]
+    served = _totals["hits"] + _totals["pending_hits"]
+    return {
+        **{k: v for k, v in _totals.items() if k != "saved_seconds"},
+        "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+        "latency_saved_seconds": round(_totals["saved_seconds"], 3),
+        "avg_saved_ms": round(1000 * _totals["saved_seconds"] / served, 2) if served else 0.0,
+    }
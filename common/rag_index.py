@@ -0,0 +1,151 @@
+# common/rag_index.py
+from typing import List, Sequence, Tuple
+import numpy as np
+
+
+def _normalize_rows(mat: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(mat, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first (partial selection, then a small sort)."""
+    n = scores.shape[0]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        idx = np.argpartition(scores, n - k)[n - k:]
+    else:
+        idx = np.arange(n)
+    return idx[np.argsort(scores[idx])[::-1]]
+
+
+class DenseIndex:
+    """Cosine index over one contiguous float32 matrix of pre-normalized rows."""
+
+    def __init__(self, vectors, normalized: bool = False):
+        mat = np.asarray(vectors, dtype=np.float32)
+        if mat.ndim != 2:
+            mat = mat.reshape(len(mat), -1)
+        if not normalized:
+            mat = _normalize_rows(mat).astype(np.float32, copy=False)
+        self.matrix = np.ascontiguousarray(mat)
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    def _prepare(self, queries) -> np.ndarray:
+        q = np.asarray(queries, dtype=np.float32)
+        return _normalize_rows(q.reshape(-1, self.dim))
+
+    def search(self, query: Sequence[float], k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (row ids, cosine scores) of the top k rows for one query vector."""
+        if not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        scores = self.matrix @ self._prepare(query)[0]
+        idx = top_k(scores, k)
+        return idx, scores[idx]
+
+    def search_many(self, queries, k: int = 5) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Batched search: one matrix-matrix product for all queries."""
+        q = self._prepare(queries)
+        if not len(self):
+            empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+            return [empty for _ in range(q.shape[0])]
+        scores = q @ self.matrix.T
+        out = []
+        for row in scores:
+            idx = top_k(row, k)
+            out.append((idx, row[idx]))
+        return out
+
+
+class BM25Index:
+    """BM25 over a term -> postings inverted index stored CSR-style in flat arrays.
+
+    Postings for term id t live in doc_ids/weights[offsets[t]:offsets[t+1]]. The
+    BM25 term weight does not depend on the query, so it is precomputed per posting
+    and a query only sums the postings of its own terms.
+    """
+
+    def __init__(self, terms: List[str], offsets: np.ndarray, doc_ids: np.ndarray,
+                 weights: np.ndarray, n_docs: int):
+        self.terms = terms
+        self.vocab = {t: i for i, t in enumerate(terms)}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.n_docs = n_docs
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    @classmethod
+    def build(cls, docs: Sequence[Sequence[str]], k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        n = len(docs)
+        postings = {}  # term -> ([doc ids], [tf])
+        lengths = np.fromiter((len(d) for d in docs), dtype=np.float32, count=n)
+        for doc_id, tokens in enumerate(docs):
+            tf = {}
+            for t in tokens:
+                tf[t] = tf.get(t, 0) + 1
+            for t, c in tf.items():
+                ids, cnts = postings.setdefault(t, ([], []))
+                ids.append(doc_id)
+                cnts.append(c)
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings[t][0]) for t in terms])
+        doc_ids = np.fromiter((d for t in terms for d in postings[t][0]), dtype=np.int32, count=int(offsets[-1]))
+        tfs = np.fromiter((c for t in terms for c in postings[t][1]), dtype=np.float32, count=int(offsets[-1]))
+        df = np.diff(offsets).astype(np.float32)
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        avgdl = float(lengths.mean()) if n else 1.0
+        norm = k1 * (1.0 - b + b * lengths[doc_ids] / (avgdl or 1.0))
+        weights = np.repeat(idf, np.diff(offsets)) * tfs * (k1 + 1.0) / (tfs + norm)
+        return cls(terms, offsets, doc_ids, weights.astype(np.float32), n)
+
+    def search(self, tokens: Sequence[str], k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (doc ids, BM25 scores) of the top k docs; touches only the query terms' postings."""
+        spans = [(self.offsets[i], self.offsets[i + 1])
+                 for i in (self.vocab.get(t) for t in tokens) if i is not None]
+        if not spans or not self.n_docs:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        ids = np.concatenate([self.doc_ids[s:e] for s, e in spans])
+        w = np.concatenate([self.weights[s:e] for s, e in spans])
+        scores = np.bincount(ids, weights=w, minlength=self.n_docs)
+        idx = top_k(scores, k)
+        idx = idx[scores[idx] > 0]
+        return idx, scores[idx]
+
+    def save(self, path: str, **extra):
+        with open(path, "wb") as f:
+            np.savez(f, terms=np.array(self.terms, dtype=str), offsets=self.offsets,
+                     doc_ids=self.doc_ids, weights=self.weights, n_docs=np.int64(self.n_docs),
+                     **{k: np.asarray(v) for k, v in extra.items()})
+
+    @classmethod
+    def load(cls, path: str) -> Tuple["BM25Index", dict]:
+        with np.load(path, allow_pickle=False) as z:
+            extra = {k: z[k] for k in z.files if k not in ("terms", "offsets", "doc_ids", "weights", "n_docs")}
+            index = cls(z["terms"].tolist(), z["offsets"], z["doc_ids"], z["weights"], int(z["n_docs"]))
+        return index, extra
+
+
+def rrf_fuse(rankings: Sequence[np.ndarray], n: int, k: int = 5, rrf_k: int = 60) -> Tuple[np.ndarray, np.ndarray]:
+    """Reciprocal rank fusion: score(d) = sum over rankings of 1 / (rrf_k + rank(d))."""
+    rankings = [np.asarray(r, dtype=np.int64) for r in rankings if len(r)]
+    if not rankings or not n:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    ids = np.concatenate(rankings)
+    ranks = np.concatenate([np.arange(1, len(r) + 1) for r in rankings])
+    scores = np.bincount(ids, weights=1.0 / (rrf_k + ranks), minlength=n)
+    idx = top_k(scores, k)
+    idx = idx[scores[idx] > 0]
+    return idx, scores[idx]
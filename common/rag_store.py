@@ -1,170 +1,677 @@
-# common/rag_store.py
-import os, math, re, json, hashlib, time
-from dataclasses import dataclass
-from typing import List, Tuple, Optional
-from .config import (
-    DOCS_PATH, CHUNK_SIZE, CHUNK_OVERLAP, USE_OPENAI_EMBEDDINGS,
-    OPENAI_EMBED_MODEL, EMBED_BATCH_SIZE, RAG_CACHE_DIR
-)
-
-# Optional OpenAI client (graceful fallback)
-_client = None
-if USE_OPENAI_EMBEDDINGS:
-    try:
-        from openai import OpenAI
-        _client = OpenAI()
-    except Exception:
-        _client = None
-
-from docx import Document
-_WORD = re.compile(r"[A-Za-z0-9_]+")
-
-def _read_docx(path: str) -> str:
-    doc = Document(path)
-    parts: List[str] = []
-    for p in doc.paragraphs:
-        t = p.text.strip()
-        if t: parts.append(t)
-    for tbl in doc.tables:
-        for row in tbl.rows:
-            row_text = [cell.text.strip() for cell in row.cells]
-            if any(row_text): parts.append("\t".join(row_text))
-    full = "\n".join(parts)
-    full = re.sub(r"\n{3,}", "\n\n", full)
-    return full
-
-def _read_file(path: str) -> str:
-    if not os.path.exists(path):
-        return ""
-    ext = os.path.splitext(path)[1].lower()
-    if ext == ".docx":
-        try:
-            return _read_docx(path)
-        except Exception:
-            return ""
-    try:
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-            return f.read()
-    except Exception:
-        return ""
-
-def _chunk(text: str, size: int, overlap: int) -> List[str]:
-    if not text: return []
-    chunks, i = [], 0
-    step = max(1, size - overlap)
-    while i < len(text):
-        chunks.append(text[i:i+size])
-        i += step
-    return chunks
-
-# ---- sparse fallback ----
-def _tokens(s: str) -> List[str]:
-    return [t.lower() for t in _WORD.findall(s)]
-
-def _bow(tokens: List[str]) -> dict:
-    bag = {}
-    for t in tokens:
-        bag[t] = bag.get(t, 0) + 1
-    return bag
-
-def _normalize_sparse(vec: dict) -> dict:
-    norm = math.sqrt(sum(v*v for v in vec.values())) or 1.0
-    return {k: v / norm for k, v in vec.items()}
-
-def _cos_sparse(a: dict, b: dict) -> float:
-    if not a or not b: return 0.0
-    if len(a) > len(b): a, b = b, a
-    return sum(a[k]*b.get(k,0.0) for k in a)
-
-# ---- dense ----
-def _cos_dense(a: List[float], b: List[float]) -> float:
-    if not a or not b: return 0.0
-    s = sum(x*y for x, y in zip(a, b))
-    na = math.sqrt(sum(x*x for x in a)) or 1.0
-    nb = math.sqrt(sum(y*y for y in b)) or 1.0
-    return s / (na * nb)
-
-def _doc_signature(path: str) -> str:
-    try:
-        st = os.stat(path)
-        payload = f"{path}|{st.st_size}|{int(st.st_mtime)}"
-    except FileNotFoundError:
-        payload = f"{path}|0|0"
-    return hashlib.sha256(payload.encode()).hexdigest()
-
-def _ensure_dir(p: str):
-    os.makedirs(p, exist_ok=True)
-
-@dataclass
-class RagChunk:
-    text: str
-    meta: dict
-    vec_sparse: Optional[dict] = None
-    vec_dense: Optional[List[float]] = None
-
-class RagStore:
-    def __init__(self, path: str = DOCS_PATH):
-        self.path = path
-        self.chunks: List[RagChunk] = []
-        self._build()
-
-    def _build(self):
-        text = _read_file(self.path)
-        parts = _chunk(text, CHUNK_SIZE, CHUNK_OVERLAP)
-        if USE_OPENAI_EMBEDDINGS and _client is not None:
-            self._build_dense(parts)
-        else:
-            self._build_sparse(parts)
-
-    def _build_sparse(self, parts: List[str]):
-        self.chunks = []
-        for i, p in enumerate(parts):
-            vec = _normalize_sparse(_bow(_tokens(p)))
-            self.chunks.append(RagChunk(text=p, meta={"chunk_id": i}, vec_sparse=vec))
-
-    def _build_dense(self, parts: List[str]):
-        _ensure_dir(RAG_CACHE_DIR)
-        sig = _doc_signature(self.path)
-        cache_file = os.path.join(RAG_CACHE_DIR, f"{sig}.embeddings.json")
-        if os.path.exists(cache_file):
-            try:
-                with open(cache_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                if data.get("model") == OPENAI_EMBED_MODEL and len(data.get("chunks", [])) == len(parts):
-                    self.chunks = [
-                        RagChunk(text=entry["text"], meta={"chunk_id": i}, vec_dense=entry["vec"])
-                        for i, entry in enumerate(data["chunks"])
-                    ]
-                    return
-            except Exception:
-                pass
-        vectors: List[List[float]] = []
-        for i in range(0, len(parts), EMBED_BATCH_SIZE):
-            batch = parts[i:i+EMBED_BATCH_SIZE]
-            resp = _client.embeddings.create(model=OPENAI_EMBED_MODEL, input=batch)
-            vectors.extend([d.embedding for d in resp.data])
-        self.chunks = [
-            RagChunk(text=p, meta={"chunk_id": i}, vec_dense=vectors[i])
-            for i, p in enumerate(parts)
-        ]
-        payload = {"model": OPENAI_EMBED_MODEL, "created": int(time.time()),
-                   "chunks": [{"text": c.text, "vec": c.vec_dense} for c in self.chunks]}
-        with open(cache_file, "w", encoding="utf-8") as f:
-            json.dump(payload, f)
-
-    def retrieve(self, query: str, k: int = 5) -> List[Tuple[RagChunk, float]]:
-        if USE_OPENAI_EMBEDDINGS and _client is not None and self.chunks and self.chunks[0].vec_dense is not None:
-            q = _client.embeddings.create(model=OPENAI_EMBED_MODEL, input=[query]).data[0].embedding
-            scored = [(c, _cos_dense(q, c.vec_dense)) for c in self.chunks]
-        else:
-            q = _normalize_sparse(_bow(_tokens(query)))
-            scored = [(c, _cos_sparse(q, c.vec_sparse or {})) for c in self.chunks]
-        scored.sort(key=lambda x: x[1], reverse=True)
-        return scored[:k]
-
-_store = None
-def get_store():
-    global _store
-    if _store is None:
-        _store = RagStore(DOCS_PATH)
-    return _store
+# common/rag_store.py
+import os, re, json, hashlib, shutil, time, asyncio, threading, weakref
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Tuple, Optional
+import numpy as np
+from .config import (
+    DOCS_PATH, DOCS_EXTENSIONS, INGEST_WORKERS, CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_BOUNDARY, USE_OPENAI_EMBEDDINGS,
+    OPENAI_EMBED_MODEL, EMBED_BATCH_SIZE, RAG_CACHE_DIR,
+    QUERY_CACHE_SIZE, QUERY_CACHE_TTL, QUERY_CACHE_DISK, QUERY_CACHE_DISK_MAX, EMBED_TIMEOUT,
+    BM25_K1, BM25_B, RETRIEVAL_MODE, HYBRID_SKIP_DENSE, HYBRID_DENSE_DEADLINE,
+    HYBRID_CANDIDATES, RRF_K, INDEX_ARTIFACT_DIR, INDEX_ARTIFACT_KEEP, RESULT_CACHE_SIZE, RESULT_CACHE_THRESHOLD, RESULT_CACHE_AUDIT_RATE
+)
+from .rag_index import DenseIndex, BM25Index, rrf_fuse
+from .embed_cache import QueryEmbeddingCache
+from .result_cache import SemanticResultCache
+from .chunk_store import ChunkEmbeddingStore
+from .chunking import stream_chunks, BOUNDARIES
+
+# Optional OpenAI client (graceful fallback). openai takes the better part of a second
+# to import, so it is loaded on first use (or by warm_store's background thread).
+_client = None
+_client_ready = False
+_client_lock = threading.Lock()
+
+def _openai_client():
+    """The sync OpenAI client, or None when embeddings are disabled or unavailable."""
+    global _client, _client_ready
+    if not _client_ready:
+        with _client_lock:
+            if not _client_ready:
+                if _client is None and USE_OPENAI_EMBEDDINGS:
+                    try:
+                        from openai import OpenAI
+                        _client = OpenAI(timeout=EMBED_TIMEOUT)
+                    except Exception:
+                        _client = None
+                _client_ready = True
+    return _client
+
+# AsyncOpenAI pools its connections per event loop, so keep one client per loop
+_async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+def _async_client():
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        from openai import AsyncOpenAI
+        client = _async_clients[loop] = AsyncOpenAI(timeout=EMBED_TIMEOUT, max_retries=1)
+    return client
+
+# CPU scoring runs here so it never holds the agent event loop
+_score_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rag-score")
+# blocking query-embedding calls that must honour a deadline (sync hybrid retrieve)
+_embed_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rag-embed")
+
+_query_cache = QueryEmbeddingCache(
+    max_size=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL,
+    disk_dir=os.path.join(RAG_CACHE_DIR, "queries") if QUERY_CACHE_DISK else None,
+    disk_max_entries=QUERY_CACHE_DISK_MAX,
+)
+
+def _embed_query(query: str) -> List[float]:
+    return _openai_client().embeddings.create(model=OPENAI_EMBED_MODEL, input=[query]).data[0].embedding
+
+def _embed_batch(texts: List[str]) -> List[List[float]]:
+    resp = _openai_client().embeddings.create(model=OPENAI_EMBED_MODEL, input=texts)
+    return [d.embedding for d in resp.data]
+
+async def _aembed_query(query: str) -> List[float]:
+    resp = await _async_client().embeddings.create(model=OPENAI_EMBED_MODEL, input=[query])
+    return resp.data[0].embedding
+
+def query_cache_stats() -> dict:
+    return _query_cache.stats()
+
+def result_cache_stats() -> dict:
+    """Semantic result cache counters of the shared store (empty before it is built)."""
+    if _store is None or _store.results is None:
+        return {}
+    return _store.results.stats()
+
+def _open_docx(path: str):
+    from docx import Document  # python-docx is only needed when a DOCX is actually parsed
+    return Document(path)
+
+_WORD = re.compile(r"[A-Za-z0-9_]+")
+
+_TEXT_BLOCK = 1 << 16  # characters per read when streaming plain-text files
+
+def _docx_blocks(doc) -> Iterator[str]:
+    """Non-empty paragraphs, then table rows (tab-joined cells), one at a time."""
+    for p in doc.paragraphs:
+        t = p.text.strip()
+        if t: yield re.sub(r"\n{3,}", "\n\n", t)
+    for tbl in doc.tables:
+        for row in tbl.rows:
+            row_text = [cell.text.strip() for cell in row.cells]
+            if any(row_text): yield re.sub(r"\n{3,}", "\n\n", "\t".join(row_text))
+
+def _content_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _iter_text(path: str) -> Iterator[str]:
+    """A file's text as a stream of pieces: DOCX paragraph by paragraph, text files in blocks."""
+    if not os.path.exists(path):
+        return
+    if os.path.splitext(path)[1].lower() == ".docx":
+        try:
+            for i, block in enumerate(_docx_blocks(_open_docx(path))):
+                yield block if i == 0 else "\n" + block
+        except Exception:
+            return
+        return
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            yield from iter(lambda: f.read(_TEXT_BLOCK), "")
+    except Exception:
+        return
+
+def _iter_text_cached(path: str) -> Iterator[str]:
+    """_iter_text, with DOCX text cached under the file's content hash (no re-parse when unchanged)."""
+    if os.path.splitext(path)[1].lower() != ".docx" or not os.path.exists(path):
+        yield from _iter_text(path)
+        return
+    text_file = os.path.join(RAG_CACHE_DIR, "text", f"{_content_hash(path)}.txt")
+    if os.path.exists(text_file):
+        yield from _iter_text(text_file)
+        return
+    tmp = f"{text_file}.{os.getpid()}.tmp"
+    try:
+        _ensure_dir(os.path.dirname(text_file))
+        out = open(tmp, "w", encoding="utf-8")
+    except OSError:
+        yield from _iter_text(path)
+        return
+    complete = wrote = False
+    try:
+        with out:
+            for piece in _iter_text(path):
+                out.write(piece)  # the cache is written as the parse streams, never held whole
+                wrote = True
+                yield piece
+        complete = True
+    finally:
+        try:
+            if complete and wrote:
+                os.replace(tmp, text_file)
+            else:
+                os.remove(tmp)
+        except OSError:
+            pass
+
+# ---- corpus (a single file or a directory of DOCX/TXT/Markdown) ----
+def _corpus_files(path: str) -> List[str]:
+    if not os.path.isdir(path):
+        return [path]
+    files = []
+    for root, dirs, names in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        files.extend(os.path.join(root, n) for n in sorted(names)
+                     if not n.startswith((".", "~$")) and os.path.splitext(n)[1].lower() in DOCS_EXTENSIONS)
+    return files
+
+def _file_chunks(path: str, root: str, size: int, overlap: int, boundary: str) -> Iterator[Tuple[str, dict]]:
+    """(text, meta) per chunk of one file, produced while the file is still being read."""
+    source = os.path.relpath(path, root) if root != path else os.path.basename(path)
+    for start, text in stream_chunks(_iter_text_cached(path), size, overlap, boundary):
+        yield text, {"source": source, "start": start, "end": start + len(text)}
+
+def _ingest_file(path: str, root: str, size: int, overlap: int, boundary: str) -> List[Tuple[str, dict]]:
+    """Parse and chunk one file in a worker process."""
+    return list(_file_chunks(path, root, size, overlap, boundary))
+
+def _ingest(path: str, workers: int = INGEST_WORKERS, boundary: str = CHUNK_BOUNDARY) -> Iterator[Tuple[str, dict]]:
+    """Chunks of every file under path, in file order; several files are parsed in a process pool."""
+    files = _corpus_files(path)
+    args = (path, CHUNK_SIZE, CHUNK_OVERLAP, boundary)
+    if workers > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(files))) as pool:
+            for chunks in pool.map(_ingest_file, files, *[[a] * len(files) for a in args]):
+                yield from chunks
+    else:
+        for f in files:
+            yield from _file_chunks(f, *args)
+
+# ---- sparse fallback ----
+def _tokens(s: str) -> List[str]:
+    return [t.lower() for t in _WORD.findall(s)]
+
+def _doc_signature(path: str) -> str:
+    entries = []
+    for f in _corpus_files(path):
+        try:
+            st = os.stat(f)
+            entries.append(f"{f}|{st.st_size}|{int(st.st_mtime)}")
+        except FileNotFoundError:
+            entries.append(f"{f}|0|0")
+    return hashlib.sha256("\n".join(entries).encode()).hexdigest()
+
+def _ensure_dir(p: str):
+    os.makedirs(p, exist_ok=True)
+
+# ---- embedding cache ----
+# Binary format: <sig>.vectors.npy holds the pre-normalized float32 matrix and is
+# memory-mapped on load; <sig>.meta.json is a small sidecar with model, shape and
+# chunk texts. Legacy <sig>.embeddings.json caches are converted on first load and
+# left in place (they may be tracked in git); the binary cache is read first.
+def _bm25_path(sig: str) -> str:
+    return os.path.join(RAG_CACHE_DIR, f"{sig}.bm25.npz")
+
+def _cache_paths(sig: str) -> Tuple[str, str, str]:
+    base = os.path.join(RAG_CACHE_DIR, sig)
+    return base + ".vectors.npy", base + ".meta.json", base + ".embeddings.json"
+
+def _load_binary_cache(sig: str) -> Optional[Tuple[dict, np.ndarray]]:
+    vec_file, meta_file, _ = _cache_paths(sig)
+    if not (os.path.exists(vec_file) and os.path.exists(meta_file)):
+        return None
+    try:
+        with open(meta_file, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        mat = np.load(vec_file, mmap_mode="r")
+        if mat.dtype != np.float32 or mat.shape != (meta["count"], meta["dim"]):
+            return None
+        return meta, mat
+    except Exception:
+        return None
+
+def _save_binary_cache(sig: str, model: str, texts: List[str], mat: np.ndarray):
+    vec_file, meta_file, _ = _cache_paths(sig)
+    meta = {"format": 1, "model": model, "created": int(time.time()),
+            "count": int(mat.shape[0]), "dim": int(mat.shape[1]), "texts": list(texts)}
+    # write-then-rename so a crashed write never leaves a half cache behind
+    with open(vec_file + ".tmp", "wb") as f:
+        np.save(f, np.ascontiguousarray(mat, dtype=np.float32))
+    with open(meta_file + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(vec_file + ".tmp", vec_file)
+    os.replace(meta_file + ".tmp", meta_file)
+
+def _load_json_cache(path: str) -> Optional[Tuple[dict, np.ndarray]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        entries = data.get("chunks", [])
+        texts = [e["text"] for e in entries]
+        mat = DenseIndex([e["vec"] for e in entries]).matrix if entries else np.zeros((0, 0), np.float32)
+        meta = {"model": data.get("model"), "count": len(texts), "dim": int(mat.shape[1]), "texts": texts}
+        return meta, mat
+    except Exception:
+        return None
+
+def _migrate_json_cache(sig: str) -> Optional[Tuple[dict, np.ndarray]]:
+    _, _, json_file = _cache_paths(sig)
+    if not os.path.exists(json_file):
+        return None
+    cached = _load_json_cache(json_file)
+    if cached is None or not cached[0]["count"]:
+        return cached
+    meta, mat = cached
+    try:
+        _save_binary_cache(sig, meta["model"], meta["texts"], mat)
+        return _load_binary_cache(sig) or cached
+    except OSError:
+        return cached
+
+class _EmbedFeeder:
+    """Sends chunks missing from the chunk store to the embedding API while ingestion runs.
+
+    Full batches go to a single background thread as soon as they fill up, so
+    parsing and embedding requests overlap; ``finish`` waits for them and embeds
+    whatever is left.
+    """
+
+    def __init__(self, store: ChunkEmbeddingStore, batch_size: int = EMBED_BATCH_SIZE):
+        self.store = store
+        self.batch_size = batch_size
+        self._batch: List[str] = []
+        self._queued = set()  # texts sent or waiting to be sent; repeats count as reused
+        self._futures = []
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-ingest-embed")
+
+    def feed(self, text: str):
+        if text in self._queued or self.store.contains(text):
+            self.store.reused += 1
+            return
+        self._queued.add(text)
+        self._batch.append(text)
+        if len(self._batch) >= self.batch_size:
+            self._futures.append(self._pool.submit(self.store.embed_missing, self._batch, _embed_batch,
+                                                   self.batch_size))
+            self._batch = []
+
+    def finish(self, parts: List[str]) -> np.ndarray:
+        """Matrix for ``parts``, every one of which must have been fed."""
+        try:
+            for fut in self._futures:
+                fut.result()
+        finally:
+            self._pool.shutdown()
+        self.store.embed_missing(self._batch, _embed_batch, self.batch_size)
+        self._batch = []
+        return self.store.matrix(parts)
+
+    def close(self):
+        for fut in self._futures:
+            fut.cancel()
+        self._pool.shutdown(wait=False)
+
+@dataclass
+class RagChunk:
+    text: str
+    meta: dict
+    vec_dense: Optional[np.ndarray] = None  # row view into the dense index
+
+class RagStore:
+    """Chunk store over DOCS_PATH (one document, or a directory of DOCX/TXT/Markdown files).
+
+    Each chunk's meta holds its ``chunk_id``, ``source`` file and character span.
+
+    mode: "auto" (dense when embeddings are available, else BM25), "dense", "sparse",
+    or "hybrid" (both indexes, rankings fused with reciprocal rank fusion).
+    """
+
+    def __init__(self, path: str = DOCS_PATH, mode: str = RETRIEVAL_MODE, build: bool = True):
+        self.path = path
+        self.mode = mode
+        self.chunks: List[RagChunk] = []
+        self._dense: Optional[DenseIndex] = None
+        self._sparse: Optional[BM25Index] = None
+        self.dense_deadline_misses = 0
+        self.dense_errors = 0  # hybrid queries answered by BM25 alone after an embedding error
+        self.chunk_stats = {}  # reused/embedded chunk counts of the last re-embedding
+        # near-duplicate questions reuse earlier passages (queries with an embedding only)
+        self.results = SemanticResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_THRESHOLD, RESULT_CACHE_AUDIT_RATE) \
+            if RESULT_CACHE_SIZE > 0 else None
+        if build:
+            self._build()
+
+    @classmethod
+    def from_artifact(cls, art_dir: str, manifest: dict, mode: str = RETRIEVAL_MODE) -> "RagStore":
+        """Store backed by a prebuilt index artifact (see build_artifact); nothing is parsed or embedded."""
+        store = cls(manifest["source"], mode, build=False)
+        with open(os.path.join(art_dir, "chunks.jsonl"), "r", encoding="utf-8") as f:
+            store.chunks = [RagChunk(text=e["text"], meta=e["meta"]) for e in map(json.loads, f)]
+        if manifest.get("dense") and mode != "sparse":
+            store._set_dense(np.load(os.path.join(art_dir, "vectors.npy"), mmap_mode="r"), normalized=True)
+        store._sparse, _ = BM25Index.load(os.path.join(art_dir, "bm25.npz"))
+        return store
+
+    def rebuild(self):
+        """Re-read the document and rebuild the indexes; cached results are dropped."""
+        self._dense = self._sparse = None
+        self._build()
+
+    def _build(self):
+        if self.results is not None and len(self.results):
+            self.results.clear()
+        dense = self.mode != "sparse" and USE_OPENAI_EMBEDDINGS and _openai_client() is not None
+        sig = _doc_signature(self.path)
+        cached = self._load_dense_cache(sig) if dense else None
+        # nothing cached for this signature: embed batches while ingestion is still producing chunks
+        feeder = _EmbedFeeder(ChunkEmbeddingStore(RAG_CACHE_DIR, OPENAI_EMBED_MODEL)) \
+            if dense and cached is None else None
+        self.chunks = []
+        try:
+            for i, (text, meta) in enumerate(_ingest(self.path)):
+                self.chunks.append(RagChunk(text=text, meta={"chunk_id": i, **meta}))
+                if feeder is not None:
+                    feeder.feed(text)
+        except BaseException:
+            if feeder is not None:
+                feeder.close()
+            raise
+        parts = [c.text for c in self.chunks]
+        if dense:
+            self._build_dense(parts, sig, cached, feeder)
+        if self.mode in ("sparse", "hybrid") or self._dense is None:
+            self._build_sparse(parts)
+
+    def _build_sparse(self, parts: List[str]):
+        _ensure_dir(RAG_CACHE_DIR)
+        path = _bm25_path(_doc_signature(self.path))
+        params = np.array([BM25_K1, BM25_B, CHUNK_SIZE, CHUNK_OVERLAP, BOUNDARIES.index(CHUNK_BOUNDARY)],
+                          dtype=np.float64)
+        if os.path.exists(path):
+            try:
+                index, extra = BM25Index.load(path)
+                if len(index) == len(parts) and np.array_equal(extra.get("params"), params):
+                    self._sparse = index
+                    return
+            except Exception:
+                pass
+        self._sparse = BM25Index.build([_tokens(p) for p in parts], k1=BM25_K1, b=BM25_B)
+        try:
+            self._sparse.save(path + ".tmp", params=params)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass
+
+    def _load_dense_cache(self, sig: str) -> Optional[Tuple[dict, np.ndarray]]:
+        _ensure_dir(RAG_CACHE_DIR)
+        cached = _load_binary_cache(sig)
+        if cached is None:
+            cached = _migrate_json_cache(sig)
+        if cached is None or cached[0].get("model") != OPENAI_EMBED_MODEL:
+            return None
+        return cached
+
+    def _build_dense(self, parts: List[str], sig: str, cached, feeder: Optional["_EmbedFeeder"]):
+        if cached is not None and cached[0].get("texts") == parts:
+            meta, mat = cached
+            self._set_dense(mat, normalized=True)
+            chunk_store = ChunkEmbeddingStore(RAG_CACHE_DIR, OPENAI_EMBED_MODEL)
+            if chunk_store.add(meta["texts"], mat):  # seed the chunk store from older caches
+                chunk_store.save(meta["texts"])
+            return
+        # doc changed: only chunks whose text is not in the chunk store go to the API;
+        # batches span document boundaries, so a corpus of small files still fills each request
+        if feeder is None:
+            feeder = _EmbedFeeder(ChunkEmbeddingStore(RAG_CACHE_DIR, OPENAI_EMBED_MODEL))
+            for text in parts:
+                feeder.feed(text)
+        chunk_store = feeder.store
+        mat = feeder.finish(parts)
+        self.chunk_stats = chunk_store.stats()
+        self._set_dense(mat, normalized=True)
+        if self._dense is not None:
+            chunk_store.save(parts)
+            _save_binary_cache(sig, OPENAI_EMBED_MODEL, parts, self._dense.matrix)
+
+    def _set_dense(self, vectors, normalized: bool = False):
+        self._dense = DenseIndex(vectors, normalized=normalized) if len(self.chunks) else None
+        for i, c in enumerate(self.chunks):
+            c.vec_dense = self._dense.matrix[i]
+
+    def _use_dense(self) -> bool:
+        return USE_OPENAI_EMBEDDINGS and self._dense is not None and _openai_client() is not None
+
+    def _use_hybrid(self) -> bool:
+        return self.mode == "hybrid" and self._sparse is not None and self._use_dense()
+
+    def _hits(self, ids, scores) -> List[Tuple[RagChunk, float]]:
+        return [(self.chunks[i], float(s)) for i, s in zip(ids.tolist(), scores.tolist())]
+
+    def _retrieve_sparse(self, query: str, k: int) -> List[Tuple[RagChunk, float]]:
+        if self._sparse is None:
+            return []
+        return self._hits(*self._sparse.search(_tokens(query), k))
+
+    def _fuse(self, query: str, q: Optional[np.ndarray], k: int) -> List[Tuple[RagChunk, float]]:
+        """RRF over the dense and sparse candidate lists; q=None means sparse leg only."""
+        rankings = [self._sparse.search(_tokens(query), HYBRID_CANDIDATES)[0]]
+        if q is not None:
+            rankings.append(self._dense.search(q, HYBRID_CANDIDATES)[0])
+        return self._hits(*rrf_fuse(rankings, len(self.chunks), k, RRF_K))
+
+    def _cached(self, q: Optional[np.ndarray], k: int, compute) -> List[Tuple[RagChunk, float]]:
+        """compute() unless a near-identical query embedding already has results cached."""
+        if q is None or self.results is None:
+            return compute()
+        hits = self.results.get(q, k)
+        if hits is not None:
+            if self.results.should_audit():
+                self.results.audit(hits, compute())
+            return hits
+        hits = compute()
+        self.results.put(q, k, hits)
+        return hits
+
+    def _retrieve_hybrid(self, query: str, k: int) -> List[Tuple[RagChunk, float]]:
+        q = None
+        if not HYBRID_SKIP_DENSE:
+            fut = _embed_pool.submit(_query_cache.get_or_compute, query, OPENAI_EMBED_MODEL, _embed_query,
+                                     EMBED_TIMEOUT)
+            try:
+                q = fut.result(timeout=HYBRID_DENSE_DEADLINE)
+            except FutureTimeout:
+                self.dense_deadline_misses += 1  # the request keeps running and fills the cache
+            except Exception:
+                self.dense_errors += 1  # auth/rate-limit/network: the sparse leg still answers
+        return self._cached(q, k, lambda: self._fuse(query, q, k))
+
+    def retrieve(self, query: str, k: int = 5) -> List[Tuple[RagChunk, float]]:
+        if self._use_hybrid():
+            return self._retrieve_hybrid(query, k)
+        if self._use_dense():
+            q = _query_cache.get_or_compute(query, OPENAI_EMBED_MODEL, _embed_query, EMBED_TIMEOUT)
+            return self._cached(q, k, lambda: self._hits(*self._dense.search(q, k)))
+        return self._retrieve_sparse(query, k)
+
+    def retrieve_many(self, queries: List[str], k: int = 5) -> List[List[Tuple[RagChunk, float]]]:
+        """Batched retrieve: one embedding request and one matrix product for all queries."""
+        if not queries:
+            return []
+        if self._use_hybrid():
+            return [self._retrieve_hybrid(q, k) for q in queries]
+        if self._use_dense():
+            q = [_query_cache.get(t, OPENAI_EMBED_MODEL) for t in queries]
+            missing = [i for i, v in enumerate(q) if v is None]
+            if missing:
+                resp = _openai_client().embeddings.create(model=OPENAI_EMBED_MODEL, input=[queries[i] for i in missing])
+                for i, d in zip(missing, resp.data):
+                    q[i] = _query_cache.put(queries[i], OPENAI_EMBED_MODEL, d.embedding)
+            return [self._hits(ids, scores) for ids, scores in self._dense.search_many(q, k)]
+        return [self._retrieve_sparse(q, k) for q in queries]
+
+    async def aretrieve(self, query: str, k: int = 5) -> List[Tuple[RagChunk, float]]:
+        """Non-blocking retrieve: async embedding request, scoring on the score pool."""
+        loop = asyncio.get_running_loop()
+        if self._use_hybrid():
+            q = None
+            if not HYBRID_SKIP_DENSE:
+                embed = _query_cache.aget_or_compute(query, OPENAI_EMBED_MODEL, _aembed_query)
+                try:
+                    q = await asyncio.wait_for(embed, HYBRID_DENSE_DEADLINE)
+                except asyncio.TimeoutError:
+                    self.dense_deadline_misses += 1
+                except Exception:
+                    self.dense_errors += 1
+            return await loop.run_in_executor(_score_pool, self._cached, q, k, lambda: self._fuse(query, q, k))
+        if self._use_dense():
+            q = await asyncio.wait_for(
+                _query_cache.aget_or_compute(query, OPENAI_EMBED_MODEL, _aembed_query), EMBED_TIMEOUT)
+            return await loop.run_in_executor(
+                _score_pool, self._cached, q, k, lambda: self._hits(*self._dense.search(q, k)))
+        return await loop.run_in_executor(_score_pool, self._retrieve_sparse, query, k)
+
+# ---- prebuilt index artifact ----
+# <INDEX_ARTIFACT_DIR>/<build id>/{chunks.jsonl, vectors.npy, bm25.npz, manifest.json};
+# CURRENT names the build in use and is swapped atomically once a build is complete.
+ARTIFACT_FORMAT = 1
+
+class StaleIndexError(RuntimeError):
+    """The prebuilt index no longer matches the documents or the index settings."""
+
+def _corpus_hashes(path: str) -> Dict[str, str]:
+    files = _corpus_files(path)
+    return {(os.path.relpath(f, path) if f != path else os.path.basename(f)): _content_hash(f)
+            for f in files if os.path.exists(f)}
+
+def _index_params() -> dict:
+    return {"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP, "chunk_boundary": CHUNK_BOUNDARY,
+            "embed_model": OPENAI_EMBED_MODEL, "bm25_k1": BM25_K1, "bm25_b": BM25_B}
+
+def build_artifact(path: str = DOCS_PATH, out_dir: str = INDEX_ARTIFACT_DIR) -> str:
+    """Build the dense and sparse indexes for path and publish them as a new artifact version."""
+    store = RagStore(path, mode="hybrid")
+    created = time.strftime("%Y%m%d-%H%M%S")
+    base_id = build_id = f"{created}-{_doc_signature(path)[:8]}"
+    n = 0
+    while True:  # never write into an existing build (CURRENT may point at it)
+        art_dir = os.path.join(out_dir, build_id)
+        try:
+            os.makedirs(art_dir)
+            break
+        except FileExistsError:
+            n += 1
+            build_id = f"{base_id}-{n}"
+    with open(os.path.join(art_dir, "chunks.jsonl"), "w", encoding="utf-8") as f:
+        for c in store.chunks:
+            f.write(json.dumps({"text": c.text, "meta": c.meta}) + "\n")
+    dense = None
+    if store._dense is not None:
+        np.save(os.path.join(art_dir, "vectors.npy"), store._dense.matrix)
+        dense = {"model": OPENAI_EMBED_MODEL, "dim": store._dense.dim}
+    store._sparse.save(os.path.join(art_dir, "bm25.npz"))
+    manifest = {"format": ARTIFACT_FORMAT, "build_id": build_id, "created": created, "source": path,
+                "files": _corpus_hashes(path), "params": _index_params(), "chunks": len(store.chunks),
+                "dense": dense}
+    with open(os.path.join(art_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    current = os.path.join(out_dir, "CURRENT")
+    with open(current + ".tmp", "w", encoding="utf-8") as f:
+        f.write(build_id)
+    os.replace(current + ".tmp", current)
+    manifests = {d: os.path.join(out_dir, d, "manifest.json") for d in os.listdir(out_dir)}
+    builds = sorted((d for d, m in manifests.items() if os.path.isfile(m)),
+                    key=lambda d: os.stat(manifests[d]).st_mtime_ns)  # oldest first
+    for old in builds[:-(INDEX_ARTIFACT_KEEP + 1)]:
+        if old != build_id:
+            shutil.rmtree(os.path.join(out_dir, old), ignore_errors=True)
+    return art_dir
+
+def _current_artifact(out_dir: str) -> Optional[Tuple[str, dict]]:
+    try:
+        with open(os.path.join(out_dir, "CURRENT"), "r", encoding="utf-8") as f:
+            art_dir = os.path.join(out_dir, f.read().strip())
+        with open(os.path.join(art_dir, "manifest.json"), "r", encoding="utf-8") as f:
+            return art_dir, json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def check_artifact(manifest: dict, path: str = DOCS_PATH) -> Optional[str]:
+    """Why the artifact is stale for path and the current settings, or None if it is current."""
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        return f"artifact format {manifest.get('format')} != {ARTIFACT_FORMAT}"
+    if os.path.normpath(manifest.get("source", "")) != os.path.normpath(path):
+        return f"artifact was built from {manifest.get('source')}, not {path}"
+    params = _index_params()
+    changed = sorted(k for k in params if manifest.get("params", {}).get(k) != params[k])
+    if changed:
+        return f"index settings changed: {', '.join(changed)}"
+    files, built = _corpus_hashes(path), manifest.get("files", {})
+    changed = sorted(set(files) ^ set(built) | {f for f in files if built.get(f) != files[f]})
+    if changed:
+        return f"documents changed since the build: {', '.join(changed[:5])}"
+    return None
+
+def load_artifact(path: str = DOCS_PATH, out_dir: str = INDEX_ARTIFACT_DIR) -> Optional[RagStore]:
+    """Store from the current artifact; None if there is none, StaleIndexError if it is outdated."""
+    found = _current_artifact(out_dir)
+    if found is None:
+        return None
+    art_dir, manifest = found
+    reason = check_artifact(manifest, path)
+    if reason:
+        raise StaleIndexError(f"{art_dir}: {reason}; rebuild with `python -m common.rag_store build`")
+    return RagStore.from_artifact(art_dir, manifest)
+
+_store = None
+_store_lock = threading.Lock()
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = load_artifact() or RagStore(DOCS_PATH)
+    return _store
+
+def warm_store() -> RagStore:
+    """Load (or build) the store at boot and fault its vectors in, before any session starts.
+
+    The embedding client is constructed on a background thread so its import does
+    not delay boot when the index comes from a prebuilt artifact.
+    """
+    threading.Thread(target=_openai_client, name="rag-client-warmup", daemon=True).start()
+    store = get_store()
+    if store._dense is not None:
+        float(np.asarray(store._dense.matrix).sum())
+    return store
+
+async def aget_store():
+    """get_store() without blocking the event loop on the first (index-building) call."""
+    if _store is not None:
+        return _store
+    return await asyncio.get_running_loop().run_in_executor(None, get_store)
+
+def _main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(prog="python -m common.rag_store", description="Offline RAG index build.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    for name, help_text in (("build", "build a new index artifact"), ("check", "exit 1 if the artifact is missing or stale")):
+        cmd = sub.add_parser(name, help=help_text)
+        cmd.add_argument("--docs", default=DOCS_PATH)
+        cmd.add_argument("--out", default=INDEX_ARTIFACT_DIR)
+    args = ap.parse_args(argv)
+    if args.cmd == "build":
+        t0 = time.perf_counter()
+        art_dir = build_artifact(args.docs, args.out)
+        with open(os.path.join(art_dir, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        print(f"built {art_dir}: {manifest['chunks']} chunks, dense={'yes' if manifest['dense'] else 'no'} "
+              f"({time.perf_counter() - t0:.1f}s)")
+        return 0
+    found = _current_artifact(args.out)
+    reason = "no artifact" if found is None else check_artifact(found[1], args.docs)
+    print(f"stale: {reason}" if reason else f"current: {found[0]}")
+    return 1 if reason else 0
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
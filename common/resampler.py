@@ -0,0 +1,73 @@
+# common/resampler.py
+from math import gcd
+import numpy as np
+from .config import USER_AUDIO_SAMPLE_RATE, USER_AUDIO_CHANNELS, UPSTREAM_AUDIO_SAMPLE_RATE, RESAMPLER_TAPS
+
+
+def _lowpass(num_taps: int, cutoff: float, beta: float = 8.0) -> np.ndarray:
+    """Kaiser-windowed sinc low-pass; cutoff in cycles/sample (0..0.5), unity DC gain."""
+    n = np.arange(num_taps) - (num_taps - 1) / 2.0
+    h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(num_taps, beta)
+    return h / h.sum()
+
+
+class StreamingResampler:
+    """Rational polyphase FIR resampler for interleaved linear16 frames.
+
+    Converts ``in_rate`` -> ``out_rate`` (ratio up/down after reducing by the gcd),
+    downmixing ``channels`` to mono first. Filter history and the fractional output
+    phase are carried across calls, so feeding a stream frame by frame gives the
+    same samples as resampling it in one piece.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, channels: int = 1, taps_per_phase: int = 48):
+        g = gcd(in_rate, out_rate)
+        self.up, self.down = out_rate // g, in_rate // g
+        self.channels = channels
+        self.taps = taps_per_phase
+        h = _lowpass(taps_per_phase * self.up, 0.45 / max(self.up, self.down)) * self.up
+        # phases[p, i] = h[p + i*up]; reversed so a gathered window multiplies oldest-first
+        self._phases = np.ascontiguousarray(h.reshape(taps_per_phase, self.up).T[:, ::-1], dtype=np.float32)
+        self._hist = np.zeros(taps_per_phase - 1, dtype=np.float32)
+        self._in_count = 0   # input samples consumed so far
+        self._out_count = 0  # index of the next output sample
+        self._window = np.arange(taps_per_phase - 1, -1, -1)
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Resample a block of int16 (or float) samples; returns int16 mono."""
+        x = np.asarray(samples, dtype=np.float32)
+        if self.channels > 1:
+            x = x[: len(x) - len(x) % self.channels].reshape(-1, self.channels).mean(axis=1)
+        buf = np.concatenate((self._hist, x))
+        buf_start = self._in_count - (self.taps - 1)
+        self._in_count += len(x)
+        last = (self._in_count * self.up - 1) // self.down
+        n = np.arange(self._out_count, last + 1, dtype=np.int64)
+        self._out_count = last + 1
+        self._hist = buf[len(buf) - (self.taps - 1):]
+        if not len(n):
+            return np.empty(0, dtype=np.int16)
+        pos = n * self.down
+        newest = pos // self.up - buf_start
+        windows = buf[newest[:, None] - self._window[None, :]]
+        y = np.einsum("nk,nk->n", windows, self._phases[pos % self.up])
+        return np.clip(np.rint(y), -32768, 32767).astype(np.int16)
+
+    def process_bytes(self, data: bytes) -> bytes:
+        samples = np.frombuffer(data[: len(data) - len(data) % 2], dtype="<i2")
+        return self.process(samples).tobytes()
+
+
+MIC_RATE_RANGE = (8000, 192000)  # sample rates a page may report for its mic audio
+
+
+def valid_mic_rate(rate) -> bool:
+    return isinstance(rate, int) and not isinstance(rate, bool) and MIC_RATE_RANGE[0] <= rate <= MIC_RATE_RANGE[1]
+
+
+def make_upstream_resampler(in_rate: int = USER_AUDIO_SAMPLE_RATE):
+    """Resampler from browser mic audio at in_rate to the rate sent upstream, or None if they match."""
+    if in_rate == UPSTREAM_AUDIO_SAMPLE_RATE and USER_AUDIO_CHANNELS == 1:
+        return None
+    return StreamingResampler(in_rate, UPSTREAM_AUDIO_SAMPLE_RATE,
+                              channels=USER_AUDIO_CHANNELS, taps_per_phase=RESAMPLER_TAPS)
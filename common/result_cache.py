@@ -0,0 +1,109 @@
+# common/result_cache.py
+import random, threading
+from typing import List, Optional
+
+import numpy as np
+
+from .rag_index import _normalize_rows
+
+
+class SemanticResultCache:
+    """Top-k results of recent queries, looked up by embedding similarity.
+
+    A query whose (normalized) embedding has cosine >= ``threshold`` with a cached
+    query reuses that query's passages instead of scanning the index. Capacity is
+    fixed at ``max_size`` rows and the least recently used row is replaced.
+    ``audit_rate`` of the hits are re-scored by the caller and compared with the
+    cached answer (``audit``) so the threshold's effect on quality is visible.
+    """
+
+    def __init__(self, max_size: int = 256, threshold: float = 0.95, audit_rate: float = 0.0):
+        self.max_size = max_size
+        self.threshold = threshold
+        self.audit_rate = audit_rate
+        self._vecs: Optional[np.ndarray] = None  # (max_size, dim) float32, first _n rows live
+        self._results: List = [None] * max_size   # row -> (k, hits)
+        self._used = np.zeros(max_size, dtype=np.int64)  # row -> last-use tick
+        self._n = 0
+        self._tick = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._hit_sim = 0.0
+        self.audits = 0
+        self._audit_overlap = 0.0
+        self.audit_exact = 0
+
+    def _prepare(self, q) -> np.ndarray:
+        return _normalize_rows(np.asarray(q, dtype=np.float32).reshape(1, -1))[0]
+
+    def get(self, q, k: int):
+        """Cached hits (top k) for a query embedding, or None."""
+        v = self._prepare(q)
+        with self._lock:
+            if self._n and self._vecs.shape[1] == v.shape[0]:
+                sims = self._vecs[:self._n] @ v
+                row = int(np.argmax(sims))
+                cached_k, hits = self._results[row]
+                if sims[row] >= self.threshold and cached_k >= k:
+                    self._tick += 1
+                    self._used[row] = self._tick
+                    self.hits += 1
+                    self._hit_sim += float(sims[row])
+                    return hits[:k]
+            self.misses += 1
+            return None
+
+    def put(self, q, k: int, hits: list):
+        v = self._prepare(q)
+        with self._lock:
+            if self._vecs is None or self._vecs.shape[1] != v.shape[0]:
+                self._vecs = np.zeros((self.max_size, v.shape[0]), dtype=np.float32)
+                self._n = 0
+            if self._n < self.max_size:
+                row = self._n
+                self._n += 1
+            else:
+                row = int(np.argmin(self._used))
+                self.evictions += 1
+            self._tick += 1
+            self._vecs[row] = v
+            self._results[row] = (k, list(hits))
+            self._used[row] = self._tick
+
+    def should_audit(self) -> bool:
+        return self.audit_rate > 0 and random.random() < self.audit_rate
+
+    def audit(self, cached: list, fresh: list):
+        """Compare a cached answer with a freshly scored one (chunk-id overlap)."""
+        a = [c.meta["chunk_id"] for c, _ in cached]
+        b = [c.meta["chunk_id"] for c, _ in fresh]
+        with self._lock:
+            self.audits += 1
+            self._audit_overlap += len(set(a) & set(b)) / max(len(b), 1)
+            self.audit_exact += a == b
+
+    def clear(self):
+        """Drop every entry; called when the index they point into is rebuilt."""
+        with self._lock:
+            self._n = 0
+            self._results = [None] * self.max_size
+            self._used[:] = 0
+            self.invalidations += 1
+
+    def __len__(self) -> int:
+        return self._n
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": self._n, "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "avg_hit_similarity": round(self._hit_sim / self.hits, 4) if self.hits else 0.0,
+            "audits": self.audits,
+            "audit_overlap": round(self._audit_overlap / self.audits, 4) if self.audits else None,
+            "audit_exact_rate": round(self.audit_exact / self.audits, 4) if self.audits else None,
+        }
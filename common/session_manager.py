@@ -0,0 +1,58 @@
+# common/session_manager.py
+import threading
+from typing import Callable, Dict, List, Optional
+
+from .config import MAX_CONCURRENT_SESSIONS
+
+
+class SessionLimitError(RuntimeError):
+    """Raised when a new session would exceed the concurrent-session limit."""
+
+
+class SessionManager:
+    """Per-connection registry of voice agents, keyed by Socket.IO sid.
+
+    Each entry is a VoiceAgent that owns its own mic queue, speaker and upstream
+    websocket; the manager only tracks lifetimes and enforces the session cap.
+    Agents must provide a thread-safe ``stop()``.
+    """
+
+    def __init__(self, max_sessions: int = MAX_CONCURRENT_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def create(self, sid: str, factory: Callable[[], object]):
+        """Start a session for sid, replacing (and stopping) that sid's previous one."""
+        with self._lock:
+            old = self._sessions.pop(sid, None)
+            if len(self._sessions) >= self.max_sessions:
+                if old is not None:
+                    self._sessions[sid] = old
+                raise SessionLimitError(f"server is at its limit of {self.max_sessions} conversations")
+            agent = self._sessions[sid] = factory()
+        if old is not None:
+            old.stop()
+        return agent
+
+    def get(self, sid: str):
+        with self._lock:
+            return self._sessions.get(sid)
+
+    def remove(self, sid: str, agent: Optional[object] = None):
+        """Stop and drop sid's session (only if it is still ``agent`` when one is given)."""
+        with self._lock:
+            current = self._sessions.get(sid)
+            if current is None or (agent is not None and current is not agent):
+                return None
+            del self._sessions[sid]
+        current.stop()
+        return current
+
+    def sids(self) -> List[str]:
+        with self._lock:
+            return list(self._sessions)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
@@ -0,0 +1,145 @@
+# common/tts_models.py
+import json, logging, os, threading, time
+from typing import List, Optional
+
+from .config import TTS_MODELS_URL, TTS_MODELS_TTL, TTS_MODELS_MAX_STALE, TTS_MODELS_TIMEOUT, TTS_MODELS_RETRY
+
+logger = logging.getLogger(__name__)
+
+
+def format_models(data: dict) -> List[dict]:
+    """Aura-2 voices from a /v1/models response, in the shape the page expects."""
+    formatted = []
+    for model in data.get("tts", []):
+        if model.get("architecture") == "aura-2":
+            lang = (model.get("languages") or ["en"])[0]
+            md = model.get("metadata", {})
+            formatted.append({
+                "name": model.get("canonical_name", model.get("name")),
+                "display_name": model.get("name"),
+                "language": lang,
+                "accent": md.get("accent", ""),
+                "tags": ", ".join(md.get("tags", [])),
+            })
+    return formatted
+
+
+class TTSModelCatalog:
+    """In-memory TTS model list with stale-while-revalidate refresh.
+
+    ``body()`` returns the serialized ``{"models": [...]}`` response from memory.
+    After ``ttl`` it keeps serving the cached list and refreshes it on a
+    background thread; only a cold cache (or one older than ``max_stale``) makes
+    a request wait on upstream, and concurrent waiters share that one fetch.
+    Upstream requests reuse a pooled HTTP session and are conditional
+    (ETag / Last-Modified), so an unchanged list costs a 304. After a failure the
+    upstream is not retried for ``retry`` seconds.
+    """
+
+    def __init__(self, url: str = TTS_MODELS_URL, ttl: float = TTS_MODELS_TTL,
+                 max_stale: float = TTS_MODELS_MAX_STALE, timeout=TTS_MODELS_TIMEOUT, retry: float = TTS_MODELS_RETRY):
+        self.url = url
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.timeout = timeout
+        self.retry = retry
+        self._body: Optional[str] = None
+        self._fetched = 0.0
+        self._etag = None
+        self._last_modified = None
+        self._error: Optional[str] = None
+        self._failed_at = float("-inf")
+        self._refreshing = False
+        self._lock = threading.Lock()  # one upstream request at a time
+        self._session = None
+        self.counters = {"hits": 0, "stale_hits": 0, "fetches": 0, "not_modified": 0, "errors": 0}
+
+    def _http(self):
+        if self._session is None:
+            import requests  # deferred: only the model list uses it
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+            self._session = session
+        return self._session
+
+    def _fetch(self):
+        dg_api_key = os.environ.get("DEEPGRAM_API_KEY")
+        if not dg_api_key:
+            raise RuntimeError("DEEPGRAM_API_KEY not set")
+        headers = {"Authorization": f"Token {dg_api_key}"}
+        if self._body is not None:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+        self.counters["fetches"] += 1
+        response = self._http().get(self.url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and self._body is not None:
+            self.counters["not_modified"] += 1
+        elif response.status_code != 200:
+            raise RuntimeError(f"API status {response.status_code}")
+        else:
+            self._body = json.dumps({"models": format_models(response.json())})
+            self._etag = response.headers.get("ETag")
+            self._last_modified = response.headers.get("Last-Modified")
+        self._fetched = time.monotonic()
+        self._error = None
+
+    def refresh(self, force: bool = False):
+        """Fetch the list now unless another caller just did; raises if upstream fails."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._body is not None and now - self._fetched <= self.ttl:
+                return  # refreshed while we waited for the lock
+            if now - self._failed_at < self.retry:
+                raise RuntimeError(self._error)
+            try:
+                self._fetch()
+            except Exception as e:
+                self._error = str(e)
+                self._failed_at = time.monotonic()
+                self.counters["errors"] += 1
+                raise
+
+    def _refresh_quietly(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning(f"tts models: refresh failed, serving cached list: {e}")
+        finally:
+            self._refreshing = False
+
+    def refresh_async(self):
+        now = time.monotonic()
+        if self._refreshing or now - self._failed_at < self.retry:
+            return
+        if self._body is not None and now - self._fetched <= self.ttl:
+            return
+        self._refreshing = True
+        threading.Thread(target=self._refresh_quietly, name="tts-models-refresh", daemon=True).start()
+
+    def body(self) -> str:
+        """Serialized model list; served from memory unless the cache is cold."""
+        body = self._body
+        if body is not None:
+            age = time.monotonic() - self._fetched
+            if age <= self.ttl:
+                self.counters["hits"] += 1
+                return body
+            if age <= self.max_stale:
+                self.counters["stale_hits"] += 1
+                self.refresh_async()
+                return body
+        self.refresh()
+        return self._body
+
+    def models(self) -> List[dict]:
+        return json.loads(self.body())["models"]
+
+    def stats(self) -> dict:
+        age = time.monotonic() - self._fetched if self._body is not None else None
+        return {**self.counters, "age_s": None if age is None else round(age, 1), "error": self._error}
+
+
+TTS_MODELS = TTSModelCatalog()
@@ -0,0 +1,5 @@
+# tests/conftest.py
+import os, sys
+
+# run from anywhere: the repo root holds the `common` package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,59 @@
+# tests/test_nonblocking_retrieval.py
+"""retrieve_context must leave the agent event loop free while the query embedding is in flight."""
+import asyncio, time, types
+
+import numpy as np
+
+from common import rag_store
+from common.agent_functions import retrieve_context
+
+DIM = 32
+STALL_S = 0.5
+TICK_S = 0.02
+MAX_GAP_S = 0.1
+
+
+class _Embeddings:
+    def __init__(self):
+        self._rng = np.random.default_rng(0)
+
+    def create(self, model, input):
+        return types.SimpleNamespace(data=[
+            types.SimpleNamespace(embedding=self._rng.standard_normal(DIM).tolist()) for _ in input])
+
+
+def _store(tmp_path, monkeypatch):
+    doc = tmp_path / "profile.txt"
+    doc.write_text("Shubham built a voice portfolio with retrieval. " * 400, encoding="utf-8")
+    monkeypatch.setattr(rag_store, "RAG_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(rag_store._query_cache, "disk_dir", None)
+    monkeypatch.setattr(rag_store, "_client", types.SimpleNamespace(embeddings=_Embeddings()))
+    monkeypatch.setattr(rag_store, "_store", rag_store.RagStore(str(doc), mode="dense"))
+
+
+def test_loop_keeps_running_while_embedding_stalls(tmp_path, monkeypatch):
+    _store(tmp_path, monkeypatch)
+    started = []
+
+    async def stalled_embed(query):
+        started.append(time.perf_counter())
+        await asyncio.sleep(STALL_S)
+        return np.ones(DIM, dtype=np.float32).tolist()
+
+    monkeypatch.setattr(rag_store, "_aembed_query", stalled_embed)
+
+    async def run():
+        ticks = []
+        lookup = asyncio.ensure_future(retrieve_context({"query": "which projects has he built?"}))
+        while not lookup.done():  # stand-in for the mic sender: one frame per tick
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(TICK_S)
+        return ticks, lookup.result()
+
+    ticks, result = asyncio.run(run())
+
+    assert started, "the async embedding path was not used"
+    assert "error" not in result and result["results"]
+    in_flight = [t for t in ticks if t >= started[0]]
+    assert len(in_flight) >= STALL_S / TICK_S / 2
+    assert max(b - a for a, b in zip(in_flight, in_flight[1:])) < MAX_GAP_S